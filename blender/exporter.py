@@ -21,6 +21,17 @@ from bpy_extras.io_utils import ExportHelper
 import assets
 import utils
 import subprocess
+import numpy as np
+import lib.mesh_batch
+import lib.mesh_cache
+import lib.mesh_encode
+import lib.skeleton
+import lib.anim_quantize
+import lib.keyframes
+import lib.timeline
+import lib.skin_weights
+import lib.anim_texture
+import lib.vertex_animation
 
 kNodeTypeNode = 0
 kNodeTypeBone = 1
@@ -86,43 +97,20 @@ class Vertex:
         return eq
 
 class ExportVertex:
-    __slots__ = ("hash", "vertexIndex", "faceIndex", "position", "normal", "color", "texcoord0", "texcoord1")
-
-    def __init__(self):
-        self.color = [1.0, 1.0, 1.0]
-        self.texcoord0 = [0.0, 0.0]
-        self.texcoord1 = [0.0, 0.0]
-
-    def __eq__(self, v):
-        if (self.hash != v.hash):
-            return (False)
-        if (self.position != v.position):
-            return (False)
-        if (self.normal != v.normal):
-            return (False)
-        if (self.texcoord0 != v.texcoord0):
-            return (False)
-        if (self.color != v.color):
-            return (False)
-        if (self.texcoord1 != v.texcoord1):
-            return (False)  
-        return (True)
-
-    def Hash(self):
-        h = hash(self.position[0])
-        h = h * 21737 + hash(self.position[1])
-        h = h * 21737 + hash(self.position[2])
-        h = h * 21737 + hash(self.normal[0])
-        h = h * 21737 + hash(self.normal[1])
-        h = h * 21737 + hash(self.normal[2])
-        h = h * 21737 + hash(self.color[0])
-        h = h * 21737 + hash(self.color[1])
-        h = h * 21737 + hash(self.color[2])
-        h = h * 21737 + hash(self.texcoord0[0])
-        h = h * 21737 + hash(self.texcoord0[1])
-        h = h * 21737 + hash(self.texcoord1[0])
-        h = h * 21737 + hash(self.texcoord1[1])
-        self.hash = h
+    __slots__ = ("vertexIndex", "faceIndex", "position", "normal", "color", "texcoord0", "texcoord1")
+
+    def __init__(self, vertexIndex, faceIndex, position, normal, color, texcoord0, texcoord1):
+        self.vertexIndex = vertexIndex
+        self.faceIndex = faceIndex
+        self.position = position
+        self.normal = normal
+        self.color = color
+        self.texcoord0 = texcoord0
+        self.texcoord1 = texcoord1
+
+    def Key(self):
+        # Packed attributes, identical vertices have equal keys
+        return (self.position, self.normal, self.color, self.texcoord0, self.texcoord1)
 
 class ArmoryExporter(bpy.types.Operator, ExportHelper):
     """Export to Armory format"""
@@ -134,7 +122,40 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
     option_sample_animation = bpy.props.BoolProperty(name="Force Sampled Animation", description="Always export animation as per-frame samples", default=True)
     option_mesh_only = bpy.props.BoolProperty(name="Export Mesh Only", description="Export only mesh data", default=True)
     option_mesh_per_file = bpy.props.BoolProperty(name="Export Mesh Per File", description="Export each mesh to individual file", default=False)
-    option_optimize_mesh = bpy.props.BoolProperty(name="Optimized Mesh Exported", description="Slower but exports slightly smaller data", default=False)
+    option_optimize_mesh = bpy.props.EnumProperty(
+        items = [('Fast', 'Fast', 'Per-loop Python export'),
+                 ('Optimized', 'Optimized', 'Slower but exports slightly smaller data'),
+                 ('Vectorized', 'Vectorized', 'NumPy bulk export, same data as Fast')],
+        name = "Mesh Export", default='Fast')
+    option_quantize_mesh = bpy.props.EnumProperty(
+        items = [('None', 'None', 'Full float attributes'),
+                 ('High', 'High', 'Int16 positions, 16-bit octahedral normals, unorm16 uvs'),
+                 ('Low', 'Low', 'Int16 positions, 8-bit octahedral normals, half float uvs')],
+        name = "Quantize Mesh", default='None')
+    option_optimize_cache = bpy.props.BoolProperty(name="Optimize Vertex Cache", description="Reorder triangles and vertices for post-transform cache reuse", default=False)
+    option_cluster_mesh = bpy.props.BoolProperty(name="Mesh Clusters", description="Partition index arrays into meshlets with bounds and normal cones for cluster culling", default=False)
+    option_mesh_processes = bpy.props.IntProperty(name="Mesh Processes", description="Processes encoding meshes in parallel, 0 for all cores, 1 to encode on the main thread", default=1, min=0)
+    option_skin_influences = bpy.props.EnumProperty(
+        items = [('Variable', 'Variable', 'All influences with float weights'),
+                 ('4', '4', 'Strongest 4 influences per vertex'),
+                 ('8', '8', 'Strongest 8 influences per vertex')],
+        name = "Skin Influences", default='Variable')
+    option_skin_weight_bits = bpy.props.EnumProperty(
+        items = [('8', '8', 'Unorm8 weights'),
+                 ('16', '16', 'Unorm16 weights')],
+        name = "Skin Weight Bits", default='8')
+    option_skin_max_bones = bpy.props.IntProperty(name="Skin Palette Bones", description="Partition skinned meshes into bone palettes of at most this many bones, 0 to disable", default=0, min=0)
+    option_flat_skeleton = bpy.props.BoolProperty(name="Flat Skeleton", description="Export skin skeletons as parent index and local transform arrays", default=False)
+    option_animation_tolerance = bpy.props.FloatProperty(name="Animation Tolerance", description="Drop sampled keys that interpolation reproduces within this error, 0 to keep full matrices", default=0.0, min=0.0, precision=5)
+    option_animation_step = bpy.props.IntProperty(name="Animation Frame Step", description="Keep every n-th sampled frame", default=1, min=1)
+    option_quantize_animation = bpy.props.BoolProperty(name="Quantize Animation", description="Smallest-three rotations, range-quantized translation and scale, uniform key times as start and step", default=False)
+    option_bake_animation = bpy.props.BoolProperty(name="Bake Animation Textures", description="Bake per-frame bone palettes of armature actions into textures", default=False)
+    option_bake_format = bpy.props.EnumProperty(
+        items = [('Float16', 'Float16', 'Half float texels'),
+                 ('Float32', 'Float32', 'Full float texels')],
+        name = "Animation Texture Format", default='Float16')
+    option_split_mesh = bpy.props.BoolProperty(name="Split Large Meshes", description="Split meshes over 65536 vertices to fit into 16-bit indices", default=False)
+    option_weld_distance = bpy.props.FloatProperty(name="Weld Distance", description="Merge near-identical vertices in optimized mesh export, 0 to disable", default=0.0, min=0.0, precision=6)
     option_export_hide_render = bpy.props.BoolProperty(name="Export Hide Render", description="Exports objects with hidden render", default=False)
     option_spawn_all_layers = bpy.props.BoolProperty(name="Spawn All Layers", description="Spawn objects from all layers", default=False)
     option_minimize = bpy.props.BoolProperty(name="Export Minimized", description="Export binary data", default=True)
@@ -261,10 +282,7 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         return (None)
 
     def FindNode(self, name):
-        for bobjectRef in self.bobjectArray.items():
-            if (bobjectRef[0].name == name):
-                return (bobjectRef)
-        return (None)
+        return self.bobjectNames.get(name)
 
     @staticmethod
     def ClassifyAnimationCurve(fcurve):
@@ -344,225 +362,125 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
             return (ArmoryExporter.AnimationKeysDifferent(fcurve))
         return ((ArmoryExporter.AnimationKeysDifferent(fcurve)) or (ArmoryExporter.AnimationTangentsNonzero(fcurve)))
 
-    @staticmethod
-    def calc_tangent(v0, v1, v2, uv0, uv1, uv2):
-        deltaPos1 = v1 - v0
-        deltaPos2 = v2 - v0
-        deltaUV1 = uv1 - uv0
-        deltaUV2 = uv2 - uv0
-        
-        d = (deltaUV1.x * deltaUV2.y - deltaUV1.y * deltaUV2.x)
-        if d != 0:
-            r = 1.0 / d
-        else:
-            r = 1.0
-        tangent = (deltaPos1 * deltaUV2.y - deltaPos2 * deltaUV1.y) * r
-        # bitangent = (deltaPos2 * deltaUV1.x - deltaPos1 * deltaUV2.x) * r
-        return tangent
-
     @staticmethod
     def DeindexMesh(mesh, materialTable):
-        # This function deindexes all vertex positions, colors, and texcoords.
+        # This function deindexes all vertex positions, colors, and texcoords in a single pass.
         # Three separate ExportVertex structures are created for each triangle.
         vertexArray = mesh.vertices
         exportVertexArray = []
-        faceIndex = 0
-
-        for face in mesh.tessfaces:
-            k1 = face.vertices[0]
-            k2 = face.vertices[1]
-            k3 = face.vertices[2]
-
-            v1 = vertexArray[k1]
-            v2 = vertexArray[k2]
-            v3 = vertexArray[k3]
-
-            exportVertex = ExportVertex()
-            exportVertex.vertexIndex = k1
-            exportVertex.faceIndex = faceIndex
-            exportVertex.position = v1.co
-            exportVertex.normal = v1.normal if (face.use_smooth) else face.normal
-            exportVertexArray.append(exportVertex)
-
-            exportVertex = ExportVertex()
-            exportVertex.vertexIndex = k2
-            exportVertex.faceIndex = faceIndex
-            exportVertex.position = v2.co
-            exportVertex.normal = v2.normal if (face.use_smooth) else face.normal
-            exportVertexArray.append(exportVertex)
-
-            exportVertex = ExportVertex()
-            exportVertex.vertexIndex = k3
-            exportVertex.faceIndex = faceIndex
-            exportVertex.position = v3.co
-            exportVertex.normal = v3.normal if (face.use_smooth) else face.normal
-            exportVertexArray.append(exportVertex)
 
-            materialTable.append(face.material_index)
-
-            if (len(face.vertices) == 4):
-                k1 = face.vertices[0]
-                k2 = face.vertices[2]
-                k3 = face.vertices[3]
-
-                v1 = vertexArray[k1]
-                v2 = vertexArray[k2]
-                v3 = vertexArray[k3]
-
-                exportVertex = ExportVertex()
-                exportVertex.vertexIndex = k1
-                exportVertex.faceIndex = faceIndex
-                exportVertex.position = v1.co
-                exportVertex.normal = v1.normal if (face.use_smooth) else face.normal
-                exportVertexArray.append(exportVertex)
-
-                exportVertex = ExportVertex()
-                exportVertex.vertexIndex = k2
-                exportVertex.faceIndex = faceIndex
-                exportVertex.position = v2.co
-                exportVertex.normal = v2.normal if (face.use_smooth) else face.normal
-                exportVertexArray.append(exportVertex)
-
-                exportVertex = ExportVertex()
-                exportVertex.vertexIndex = k3
-                exportVertex.faceIndex = faceIndex
-                exportVertex.position = v3.co
-                exportVertex.normal = v3.normal if (face.use_smooth) else face.normal
-                exportVertexArray.append(exportVertex)
-
-                materialTable.append(face.material_index)
-
-            faceIndex += 1
-
-        colorCount = len(mesh.tessface_vertex_colors)
-        if (colorCount > 0):
+        colorFace = None
+        if (len(mesh.tessface_vertex_colors) > 0):
             colorFace = mesh.tessface_vertex_colors[0].data
-            vertexIndex = 0
-            faceIndex = 0
-
-            for face in mesh.tessfaces:
-                cf = colorFace[faceIndex]
-                exportVertexArray[vertexIndex].color = cf.color1
-                vertexIndex += 1
-                exportVertexArray[vertexIndex].color = cf.color2
-                vertexIndex += 1
-                exportVertexArray[vertexIndex].color = cf.color3
-                vertexIndex += 1
-
-                if (len(face.vertices) == 4):
-                    exportVertexArray[vertexIndex].color = cf.color1
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].color = cf.color3
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].color = cf.color4
-                    vertexIndex += 1
-
-                faceIndex += 1
-
-        texcoordCount = len(mesh.tessface_uv_textures)
-        if (texcoordCount > 0):
+        texcoordFace = None
+        texcoordFace1 = None
+        if (len(mesh.tessface_uv_textures) > 0):
             texcoordFace = mesh.tessface_uv_textures[0].data
-            vertexIndex = 0
-            faceIndex = 0
-
-            for face in mesh.tessfaces:
+            if (len(mesh.tessface_uv_textures) > 1):
+                texcoordFace1 = mesh.tessface_uv_textures[1].data
+
+        defaultColor = (1.0, 1.0, 1.0)
+        defaultTexcoord = (0.0, 0.0)
+        triCorners = (0, 1, 2)
+        quadCorners = (0, 1, 2, 0, 2, 3)
+
+        for faceIndex, face in enumerate(mesh.tessfaces):
+            faceVertices = face.vertices
+            quad = (len(faceVertices) == 4)
+            corners = quadCorners if quad else triCorners
+            faceNormal = None if (face.use_smooth) else face.normal[:]
+
+            colors = None
+            if (colorFace):
+                cf = colorFace[faceIndex]
+                colors = (cf.color1[:], cf.color2[:], cf.color3[:], cf.color4[:] if quad else None)
+            texcoords = None
+            if (texcoordFace):
                 tf = texcoordFace[faceIndex]
-                exportVertexArray[vertexIndex].texcoord0 = [tf.uv1[0], 1.0 - tf.uv1[1]] # Reverse TCY
-                vertexIndex += 1
-                exportVertexArray[vertexIndex].texcoord0 = [tf.uv2[0], 1.0 - tf.uv2[1]]
-                vertexIndex += 1
-                exportVertexArray[vertexIndex].texcoord0 = [tf.uv3[0], 1.0 - tf.uv3[1]]
-                vertexIndex += 1
-
-                if (len(face.vertices) == 4):
-                    exportVertexArray[vertexIndex].texcoord0 = [tf.uv1[0], 1.0 - tf.uv1[1]]
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].texcoord0 = [tf.uv3[0], 1.0 - tf.uv3[1]]
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].texcoord0 = [tf.uv4[0], 1.0 - tf.uv4[1]]
-                    vertexIndex += 1
-
-                faceIndex += 1
-
-            if (texcoordCount > 1):
-                texcoordFace = mesh.tessface_uv_textures[1].data
-                vertexIndex = 0
-                faceIndex = 0
-
-                for face in mesh.tessfaces:
-                    tf = texcoordFace[faceIndex]
-                    exportVertexArray[vertexIndex].texcoord1 = tf.uv1
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].texcoord1 = tf.uv2
-                    vertexIndex += 1
-                    exportVertexArray[vertexIndex].texcoord1 = tf.uv3
-                    vertexIndex += 1
-
-                    if (len(face.vertices) == 4):
-                        exportVertexArray[vertexIndex].texcoord1 = tf.uv1
-                        vertexIndex += 1
-                        exportVertexArray[vertexIndex].texcoord1 = tf.uv3
-                        vertexIndex += 1
-                        exportVertexArray[vertexIndex].texcoord1 = tf.uv4
-                        vertexIndex += 1
-
-                    faceIndex += 1
+                uvs = (tf.uv1, tf.uv2, tf.uv3, tf.uv4 if quad else None)
+                texcoords = [(uv[0], 1.0 - uv[1]) if uv else None for uv in uvs] # Reverse TCY
+            texcoords1 = None
+            if (texcoordFace1):
+                tf = texcoordFace1[faceIndex]
+                texcoords1 = (tf.uv1[:], tf.uv2[:], tf.uv3[:], tf.uv4[:] if quad else None)
+
+            for c in corners:
+                k = faceVertices[c]
+                v = vertexArray[k]
+                exportVertexArray.append(ExportVertex(
+                    k, faceIndex, v.co[:],
+                    faceNormal if faceNormal else v.normal[:],
+                    colors[c] if colors else defaultColor,
+                    texcoords[c] if texcoords else defaultTexcoord,
+                    texcoords1[c] if texcoords1 else defaultTexcoord))
 
-        for ev in exportVertexArray:
-            ev.Hash()
+            materialTable.append(face.material_index)
+            if (quad):
+                materialTable.append(face.material_index)
 
         return (exportVertexArray)
 
     @staticmethod
-    def FindExportVertex(bucket, exportVertexArray, vertex):
-        for index in bucket:
-            if (exportVertexArray[index] == vertex):
-                return (index)
-        return (-1)
-
-    @staticmethod
-    def UnifyVertices(exportVertexArray, indexTable):
-    
-        # Non-indexed
-        # for i in range(len(exportVertexArray)):
-            # indexTable.append(i)
-        # return exportVertexArray
-    
+    def UnifyVertices(exportVertexArray, indexTable, weldDistance=0.0):
         # This function looks for identical vertices having exactly the same position, normal,
         # color, and texcoords. Duplicate vertices are unified, and a new index table is returned.
-        bucketCount = len(exportVertexArray) >> 3
-        if (bucketCount > 1):
-            # Round down to nearest power of two.
-            while True:
-                count = bucketCount & (bucketCount - 1)
-                if (count == 0):
-                    break
-                bucketCount = count
-        else:
-            bucketCount = 1
-
-        hashTable = [[] for i in range(bucketCount)]
+        # With weldDistance above zero, vertices whose attributes all differ by at most
+        # weldDistance are merged as well, candidates are looked up in a spatial hash grid.
         unifiedVertexArray = []
+        keyTable = {}
+        weldGrid = {}
+        weldAttribs = []
 
-        for i in range(len(exportVertexArray)):
-            ev = exportVertexArray[i]
-            bucket = ev.hash & (bucketCount - 1)
-            
-            index = -1
-            for b in hashTable[bucket]:
-                if exportVertexArray[b] == ev:
-                    index = b
-                    break
-            
-            if index < 0:
-                indexTable.append(len(unifiedVertexArray))
+        for ev in exportVertexArray:
+            key = ev.Key()
+            index = keyTable.get(key)
+
+            if (index == None) and (weldDistance > 0.0):
+                index = ArmoryExporter.FindWeldVertex(weldGrid, weldAttribs, ev, weldDistance)
+                if (index != None):
+                    keyTable[key] = index
+
+            if (index == None):
+                index = len(unifiedVertexArray)
                 unifiedVertexArray.append(ev)
-                hashTable[bucket].append(i)
-            else:
-                indexTable.append(indexTable[index])
+                keyTable[key] = index
+                if (weldDistance > 0.0):
+                    cell = ArmoryExporter.WeldCell(ev.position, weldDistance)
+                    bucket = weldGrid.get(cell)
+                    if (bucket):
+                        bucket.append(index)
+                    else:
+                        weldGrid[cell] = [index]
+                    weldAttribs.append(ev.position + ev.normal + tuple(ev.color) + tuple(ev.texcoord0) + tuple(ev.texcoord1))
+
+            indexTable.append(index)
 
         return unifiedVertexArray
 
+    @staticmethod
+    def WeldCell(position, weldDistance):
+        return (int(math.floor(position[0] / weldDistance)), int(math.floor(position[1] / weldDistance)), int(math.floor(position[2] / weldDistance)))
+
+    @staticmethod
+    def FindWeldVertex(weldGrid, weldAttribs, ev, weldDistance):
+        # Search the 27 cells around the vertex for an already unified vertex within weldDistance
+        attribs = ev.position + ev.normal + tuple(ev.color) + tuple(ev.texcoord0) + tuple(ev.texcoord1)
+        cx, cy, cz = ArmoryExporter.WeldCell(ev.position, weldDistance)
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                for z in (cz - 1, cz, cz + 1):
+                    bucket = weldGrid.get((x, y, z))
+                    if (not bucket):
+                        continue
+                    for index in bucket:
+                        other = weldAttribs[index]
+                        for i in range(len(attribs)):
+                            if (math.fabs(attribs[i] - other[i]) > weldDistance):
+                                break
+                        else:
+                            return (index)
+        return (None)
+
     def ExportBone(self, armature, bone, scene, o, action):
         bobjectRef = self.bobjectArray.get(bone)
         
@@ -594,47 +512,58 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         
     def ExportObjectSampledAnimation(self, bobject, scene, o):
         # This function exports animation as full 4x4 matrices for each frame
-        currentFrame = scene.frame_current
-        currentSubframe = scene.frame_subframe
-
-        animationFlag = False
-        m1 = bobject.matrix_local.copy()
-
-        # Font in
-        for i in range(self.beginFrame, self.endFrame):
-            scene.frame_set(i)
-            m2 = bobject.matrix_local
-            if (ArmoryExporter.MatricesDifferent(m1, m2)):
-                animationFlag = True
-                break
-        # Font out
-
-        if (animationFlag):
-            o['animation'] = {}
-
-            tracko = {}
-            tracko['target'] = "transform"
-
-            tracko['time'] = {}
-            tracko['time']['values'] = []
-
-            for i in range(self.beginFrame, self.endFrame):
-                tracko['time']['values'].append(((i - self.beginFrame) * self.frameTime))
-
-            tracko['time']['values'].append((self.endFrame * self.frameTime))
+        samples = self.get_object_samples(scene)
+        i = self.objectSampleIndex[bobject]
+        if samples['animated'][i]:
+            times = lib.timeline.frame_times(self.beginFrame, self.endFrame, self.frameTime)
+            self.ExportSampledTracks(times, samples['matrices'][:, i], o)
+
+    def ExportSampledTracks(self, times, matrices, o):
+        o['animation'] = {}
+        # Reduced translation, rotation and scale channels
+        if ArmoryExporter.option_animation_tolerance > 0.0 or ArmoryExporter.option_animation_step > 1 or ArmoryExporter.option_quantize_animation:
+            o['animation']['tracks'] = lib.keyframes.reduce_track(matrices, times, ArmoryExporter.option_animation_tolerance, ArmoryExporter.option_animation_step)
+            if ArmoryExporter.option_quantize_animation:
+                for tracko in o['animation']['tracks']:
+                    lib.anim_quantize.quantize_track(tracko)
+            return
 
-            tracko['value'] = {}
-            tracko['value']['values'] = []
+        tracko = {}
+        tracko['target'] = "transform"
 
-            for i in range(self.beginFrame, self.endFrame):
-                scene.frame_set(i)
-                tracko['value']['values'].append(self.WriteMatrix(bobject.matrix_local))
+        tracko['time'] = {}
+        tracko['time']['values'] = times
 
-            scene.frame_set(self.endFrame)
-            tracko['value']['values'].append(self.WriteMatrix(bobject.matrix_local))
-            o['animation']['tracks'] = [tracko]
+        tracko['value'] = {}
+        tracko['value']['values'] = [m.ravel().tolist() for m in matrices]
+        o['animation']['tracks'] = [tracko]
 
+    def sample_timeline(self, scene, begin, end, read, rest):
+        # Records read() on frames begin to end, the scene is evaluated once per frame
+        currentFrame = scene.frame_current
+        currentSubframe = scene.frame_subframe
+        frames = range(begin, end + 1)
+        samples = np.empty((len(frames),) + rest.shape, dtype=rest.dtype)
+        for i, frame in enumerate(frames):
+            scene.frame_set(frame)
+            samples[i] = read()
         scene.frame_set(currentFrame, currentSubframe)
+        return samples
+
+    def get_object_samples(self, scene):
+        # Local matrices of every exported object over the scene range, sampled on first use
+        if self.objectSamples == None:
+            objects = [bobject for bobject in self.bobjectArray if isinstance(bobject, bpy.types.Object)]
+            self.objectSampleIndex = {}
+            for i, bobject in enumerate(objects):
+                self.objectSampleIndex[bobject] = i
+            read = lambda: np.array([bobject.matrix_local for bobject in objects], dtype=np.float64).reshape(-1, 4, 4)
+            rest = read()
+            matrices = self.sample_timeline(scene, self.beginFrame, self.endFrame, read, rest)
+            self.objectSamples = {}
+            self.objectSamples['animated'] = lib.timeline.animated(matrices[:-1], rest, kExportEpsilon)
+            self.objectSamples['matrices'] = matrices
+        return self.objectSamples
 
     def get_action_framerange(self, action):
         # TODO: experimental
@@ -648,56 +577,32 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
 
     def ExportBoneSampledAnimation(self, poseBone, scene, o, action):
         # This function exports bone animation as full 4x4 matrices for each frame.
-        currentFrame = scene.frame_current
-        currentSubframe = scene.frame_subframe
-
-        # Frame range
-        begin_frame, end_frame = self.get_action_framerange(action)
-
-        animationFlag = False
-        m1 = poseBone.matrix.copy()
-
-        for i in range(begin_frame, end_frame):
-            scene.frame_set(i)
-            m2 = poseBone.matrix
-            if (ArmoryExporter.MatricesDifferent(m1, m2)):
-                animationFlag = True
-                break
-
-        if (animationFlag):
-            o['animation'] = {}
-            tracko = {}
-            tracko['target'] = "transform"
-            tracko['time'] = {}
-            tracko['time']['values'] = []
-
-            for i in range(begin_frame, end_frame):
-                tracko['time']['values'].append(((i - begin_frame) * self.frameTime))
-
-            tracko['time']['values'].append((end_frame * self.frameTime))
-
-            tracko['value'] = {}
-            tracko['value']['values'] = []
-
-            parent = poseBone.parent
-            if (parent):
-                for i in range(begin_frame, end_frame):
-                    scene.frame_set(i)
-                    tracko['value']['values'].append(self.WriteMatrix(parent.matrix.inverted() * poseBone.matrix))
-
-                scene.frame_set(end_frame)
-                tracko['value']['values'].append(self.WriteMatrix(parent.matrix.inverted() * poseBone.matrix))
-            else:
-                for i in range(begin_frame, end_frame):
-                    scene.frame_set(i)
-                    tracko['value']['values'].append(self.WriteMatrix(poseBone.matrix))
-
-                scene.frame_set(end_frame)
-                tracko['value']['values'].append(self.WriteMatrix(poseBone.matrix))
-            o['animation']['tracks'] = [tracko]
-
-        scene.frame_set(currentFrame, currentSubframe)
-
+        samples = self.get_bone_samples(poseBone.id_data, action, scene)
+        i = samples['index'][poseBone.name]
+        if samples['animated'][i]:
+            times = lib.timeline.frame_times(samples['begin'], samples['end'], self.frameTime)
+            self.ExportSampledTracks(times, samples['matrices'][:, i], o)
+
+    def get_bone_samples(self, armature, action, scene):
+        # Parent-relative matrices of all pose bones over the action range, sampled once per action
+        key = (armature.name, action.name)
+        if not key in self.boneSamples:
+            poseBones = list(armature.pose.bones)
+            samples = {}
+            samples['index'] = {}
+            for i, poseBone in enumerate(poseBones):
+                samples['index'][poseBone.name] = i
+            parents = np.array([samples['index'][poseBone.parent.name] if poseBone.parent else -1 for poseBone in poseBones], dtype=np.int64)
+            read = lambda: np.array([poseBone.matrix for poseBone in poseBones], dtype=np.float64).reshape(-1, 4, 4)
+            rest = read()
+            samples['begin'], samples['end'] = self.get_action_framerange(action)
+            matrices = self.sample_timeline(scene, samples['begin'], samples['end'], read, rest)
+            # Constant tracks are compared in armature space, as before
+            samples['animated'] = lib.timeline.animated(matrices[:-1], rest, kExportEpsilon)
+            samples['matrices'] = lib.timeline.parent_relative(matrices, parents)
+            samples['pose'] = matrices
+            self.boneSamples[key] = samples
+        return self.boneSamples[key]
 
     def ExportKeyTimes(self, fcurve):
         keyo = {}
@@ -1298,6 +1203,7 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
     def ProcessBone(self, bone):
         if ((ArmoryExporter.exportAllFlag) or (bone.select)):
             self.bobjectArray[bone] = {"objectType" : kNodeTypeBone, "structName" : bone.name}
+            self.bobjectNames.setdefault(bone.name, (bone, self.bobjectArray[bone]))
 
         for subbobject in bone.children:
             self.ProcessBone(subbobject)
@@ -1310,6 +1216,7 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
                 return
 
             self.bobjectArray[bobject] = {"objectType" : btype, "structName" : bobject.name}
+            self.bobjectNames.setdefault(bobject.name, (bobject, self.bobjectArray[bobject]))
 
             if (bobject.parent_type == "BONE"):
                 boneSubbobjectArray = self.boneParentArray.get(bobject.parent_bone)
@@ -1518,6 +1425,8 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
                         action = bobject.animation_data.action
                     armatureid = utils.safe_filename(armdata.name)
                     o['bones_ref'] = 'bones_' + armatureid + '_' + action.name
+                    if ArmoryExporter.option_bake_animation:
+                        o['anim_texture_ref'] = 'anim_' + armatureid + '_' + action.name
 
                     # Write bones
                     if armdata.edit_actions:
@@ -1545,6 +1454,12 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
                             bones_obj = {}
                             bones_obj['children'] = bones
                             utils.write_arm(fp, bones_obj)
+                        # Per-frame bone palettes for instanced skinning
+                        if ArmoryExporter.option_bake_animation:
+                            fp = self.get_meshes_file_path('anim_' + armatureid + '_' + action.name)
+                            assets.add(fp)
+                            if armdata.armature_cached == False or not os.path.exists(fp):
+                                self.ExportAnimationTexture(bobject, scene, action, fp)
                     armdata.armature_cached = True
 
             if (parento == None):
@@ -1562,12 +1477,24 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
                 if (subbobject.parent_type != "BONE"):
                     self.ExportObject(subbobject, scene, None, o)
 
-    def ExportSkinQuality(self, bobject, armature, exportVertexArray, om):
-        # This function exports all skinning data, which includes the skeleton
-        # and per-vertex bone influence data
-        oskin = {}
-        om['skin'] = oskin
+    def ExportAnimationTexture(self, armature, scene, action, fp):
+        # Skinning matrices of every frame in armature space, in skin bone order
+        samples = self.get_bone_samples(armature, action, scene)
+        bones = self.GetSkinBones(armature)
+        pose = samples['pose'][:, [samples['index'][bone.name] for bone in bones]]
+        inverse_bind = np.array([bone.matrix_local.inverted() for bone in bones], dtype=np.float64).reshape(-1, 4, 4)
+        texels = lib.anim_texture.bake_palettes(pose, inverse_bind)
+        frame_rate = 1.0 / self.frameTime
+        anim_obj = lib.anim_texture.texture_data(action.name, texels, samples['begin'], frame_rate, ArmoryExporter.option_bake_format)
+        utils.write_arm(fp, anim_obj)
+
+    def ExportSkin(self, bobject, armature, vertexIndexArray, om):
+        if ArmoryExporter.option_skin_influences == 'Variable':
+            self.ExportSkinQuality(bobject, armature, vertexIndexArray, om)
+        else:
+            self.ExportSkinPalette(bobject, armature, vertexIndexArray, om)
 
+    def ExportSkinSkeleton(self, bobject, armature, oskin):
         # Write the skin bind pose transform
         otrans = {}
         oskin['transform'] = otrans
@@ -1577,6 +1504,8 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         # and and array of per-bone bind pose transforms
         oskel = {}
         oskin['skeleton'] = oskel
+        if ArmoryExporter.option_flat_skeleton:
+            return self.ExportFlatSkeleton(armature, oskel)
 
         # Write the bone object reference array
         oskel['bone_ref_array'] = []
@@ -1595,6 +1524,54 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         oskel['transforms'] = []
         for i in range(boneCount):
             oskel['transforms'].append(self.WriteMatrix(armature.matrix_world * boneArray[i].matrix_local))
+        return list(boneArray)
+
+    def GetSkinBones(self, armature):
+        # Bones in the order skin bone indices refer to
+        boneArray = armature.data.bones
+        if not ArmoryExporter.option_flat_skeleton:
+            return list(boneArray)
+        boneIndices = {}
+        for i, bone in enumerate(boneArray):
+            boneIndices[bone.name] = i
+        parents = [boneIndices[bone.parent.name] if bone.parent else -1 for bone in boneArray]
+        return [boneArray[i] for i in lib.skeleton.topological_order(parents)]
+
+    def ExportFlatSkeleton(self, armature, oskel):
+        # Bone names, parent indices, local rest transforms and inverse bind poses as packed arrays,
+        # bones are written in topological order, returns bones in that order
+        boneArray = armature.data.bones
+        boneIndices = {}
+        for i, bone in enumerate(boneArray):
+            boneIndices[bone.name] = i
+        parents = [boneIndices[bone.parent.name] if bone.parent else -1 for bone in boneArray]
+        order = lib.skeleton.topological_order(parents)
+        bones = [boneArray[i] for i in order]
+
+        oskel['names'] = [bone.name for bone in bones]
+        oskel['parents'] = lib.skeleton.reorder_parents(parents, order)
+        oskel['translations'] = []
+        oskel['rotations'] = []
+        oskel['scales'] = []
+        oskel['inverse_binds'] = []
+        for bone in bones:
+            transform = bone.matrix_local
+            if bone.parent:
+                transform = bone.parent.matrix_local.inverted() * transform
+            loc, rot, scale = transform.decompose()
+            oskel['translations'] += [loc.x, loc.y, loc.z]
+            oskel['rotations'] += [rot.x, rot.y, rot.z, rot.w]
+            oskel['scales'] += [scale.x, scale.y, scale.z]
+            oskel['inverse_binds'] += self.WriteMatrix((armature.matrix_world * bone.matrix_local).inverted())
+        return bones
+
+    def ExportSkinQuality(self, bobject, armature, vertexIndexArray, om):
+        # This function exports all skinning data, which includes the skeleton
+        # and per-vertex bone influence data
+        oskin = {}
+        om['skin'] = oskin
+        boneArray = self.ExportSkinSkeleton(bobject, armature, oskin)
+        boneCount = len(boneArray)
 
         # Export the per-vertex bone influence data
         groupRemap = []
@@ -1613,10 +1590,10 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         boneWeightArray = []
 
         meshVertexArray = bobject.data.vertices
-        for ev in exportVertexArray:
+        for vertexIndex in vertexIndexArray:
             boneCount = 0
             totalWeight = 0.0
-            for element in meshVertexArray[ev.vertexIndex].groups:
+            for element in meshVertexArray[vertexIndex].groups:
                 boneIndex = groupRemap[element.group]
                 boneWeight = element.weight
                 if ((boneIndex >= 0) and (boneWeight != 0.0)):
@@ -1640,6 +1617,39 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         # Write the bone weight array. The number of entries is the sum of the bone counts for all vertices.
         oskin['bone_weight_array'] = boneWeightArray
 
+    def ExportSkinPalette(self, bobject, armature, vertexIndexArray, om):
+        # Skinning data with a fixed number of influences per vertex,
+        # weights are unorm integers summing to the maximum value
+        oskin = {}
+        om['skin'] = oskin
+        boneArray = self.ExportSkinSkeleton(bobject, armature, oskin)
+
+        # First bone of each name, as in the linear lookup
+        boneIndices = {}
+        for i, bone in enumerate(boneArray):
+            boneIndices.setdefault(bone.name, i)
+        groupRemap = [boneIndices.get(group.name, -1) for group in bobject.vertex_groups]
+
+        # Memberships are read once per mesh vertex and gathered for exported vertices afterwards
+        vertexArray, groupArray, weightArray = self.GetVertexGroups(bobject)
+
+        influences = int(ArmoryExporter.option_skin_influences)
+        bits = int(ArmoryExporter.option_skin_weight_bits)
+        indices, weights = lib.skin_weights.build_palette(vertexArray, groupArray, weightArray, groupRemap, len(bobject.data.vertices), influences, bits)
+        lib.skin_weights.palette_skin(oskin, indices, weights, vertexIndexArray, bits)
+
+    def GetVertexGroups(self, bobject):
+        # Vertex group memberships in coordinate form, walked once per object and export
+        # and shared by the mesh digest and skin export
+        if bobject.name not in self.vertexGroups:
+            members = [(v.index, element.group, element.weight) for v in bobject.data.vertices for element in v.groups]
+            if len(members) > 0:
+                vertex, group, weight = zip(*members)
+            else:
+                vertex, group, weight = [], [], []
+            self.vertexGroups[bobject.name] = (np.array(vertex, dtype=np.int32), np.array(group, dtype=np.int32), np.array(weight, dtype=np.float32))
+        return self.vertexGroups[bobject.name]
+
     def ExportSkinFast(self, bobject, armature, vert_list, om):
         oskin = {}
         om['skin'] = oskin
@@ -1676,70 +1686,9 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         oskin['bone_index_array'] = boneIndexArray
         oskin['bone_weight_array'] = boneWeightArray
 
-    def calc_tangents(self, posa, nora, uva, ia):
-        triangle_count = int(len(ia) / 3)
-        vertex_count = int(len(posa) / 3)
-        tangents = [0] * vertex_count * 3
-        # bitangents = [0] * vertex_count * 3
-        for i in range(0, triangle_count):
-            i0 = ia[i * 3 + 0]
-            i1 = ia[i * 3 + 1]
-            i2 = ia[i * 3 + 2]
-            # TODO: Slow
-            v0 = Vector((posa[i0 * 3 + 0], posa[i0 * 3 + 1], posa[i0 * 3 + 2]))
-            v1 = Vector((posa[i1 * 3 + 0], posa[i1 * 3 + 1], posa[i1 * 3 + 2]))
-            v2 = Vector((posa[i2 * 3 + 0], posa[i2 * 3 + 1], posa[i2 * 3 + 2]))
-            uv0 = Vector((uva[i0 * 2 + 0], uva[i0 * 2 + 1]))
-            uv1 = Vector((uva[i1 * 2 + 0], uva[i1 * 2 + 1]))
-            uv2 = Vector((uva[i2 * 2 + 0], uva[i2 * 2 + 1]))
-            
-            tangent = ArmoryExporter.calc_tangent(v0, v1, v2, uv0, uv1, uv2)
-            
-            tangents[i0 * 3 + 0] += tangent.x
-            tangents[i0 * 3 + 1] += tangent.y
-            tangents[i0 * 3 + 2] += tangent.z
-            tangents[i1 * 3 + 0] += tangent.x
-            tangents[i1 * 3 + 1] += tangent.y
-            tangents[i1 * 3 + 2] += tangent.z
-            tangents[i2 * 3 + 0] += tangent.x
-            tangents[i2 * 3 + 1] += tangent.y
-            tangents[i2 * 3 + 2] += tangent.z
-            # bitangents[i0 * 3 + 0] += bitangent.x
-            # bitangents[i0 * 3 + 1] += bitangent.y
-            # bitangents[i0 * 3 + 2] += bitangent.z
-            # bitangents[i1 * 3 + 0] += bitangent.x
-            # bitangents[i1 * 3 + 1] += bitangent.y
-            # bitangents[i1 * 3 + 2] += bitangent.z
-            # bitangents[i2 * 3 + 0] += bitangent.x
-            # bitangents[i2 * 3 + 1] += bitangent.y
-            # bitangents[i2 * 3 + 2] += bitangent.z
-        
-        # Orthogonalize
-        for i in range(0, vertex_count):
-            # Slow
-            t = Vector((tangents[i * 3], tangents[i * 3 + 1], tangents[i * 3 + 2]))
-            # b = Vector((bitangents[i * 3], bitangents[i * 3 + 1], bitangents[i * 3 + 2]))
-            n = Vector((nora[i * 3], nora[i * 3 + 1], nora[i * 3 + 2]))
-            v = t - n * n.dot(t)
-            v.normalize()
-            # Calculate handedness
-            # cnv = n.cross(v)
-            # if cnv.dot(b) < 0.0:
-                # v = v * -1.0
-            tangents[i * 3] = v.x
-            tangents[i * 3 + 1] = v.y
-            tangents[i * 3 + 2] = v.z
-        return tangents
-
-    def write_mesh(self, bobject, fp, o):
-        # One mesh data per file
-        if ArmoryExporter.option_mesh_per_file:
-            mesh_obj = {}
-            mesh_obj['mesh_datas'] = [o]
-            utils.write_arm(fp, mesh_obj)
-            self.object_set_mesh_cached(bobject, True)
-        else:
-            self.output['mesh_datas'].append(o)
+    def calc_tangents(self, posa, nora, uva, ias):
+        # Tangents with handedness in w, accumulated over all index arrays
+        return lib.mesh_batch.calc_tangents(posa, nora, uva, ias).ravel().tolist()
 
     def export_mesh_fast(self, exportMesh, bobject, fp, o, om):
         # Much faster export but produces slightly less efficient data
@@ -1850,12 +1799,47 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         if (self.get_export_tangents(exportMesh) == True and num_uv_layers > 0):    
             tana = {}
             tana['attrib'] = "tangent"
-            tana['size'] = 3
-            tana['values'] = self.calc_tangents(pa['values'], na['values'], ta['values'], om['index_arrays'][0]['values'])  
+            tana['size'] = 4
+            tana['values'] = self.calc_tangents(pa['values'], na['values'], ta['values'], [ia['values'] for ia in om['index_arrays']])  
             om['vertex_arrays'].append(tana)
 
         return vert_list
 
+    def gather_mesh_buffers(self, exportMesh):
+        # Copies raw arrays out of the evaluated mesh, the only part touching bpy
+        exportMesh.calc_normals_split()
+        num_loops = len(exportMesh.loops)
+        num_polys = len(exportMesh.polygons)
+        buffers = {}
+
+        co = np.empty(len(exportMesh.vertices) * 3, dtype=np.float32)
+        exportMesh.vertices.foreach_get('co', co)
+        buffers['co'] = co.reshape(-1, 3)
+        loop_vi = np.empty(num_loops, dtype=np.int32)
+        exportMesh.loops.foreach_get('vertex_index', loop_vi)
+        buffers['loop_vi'] = loop_vi
+        loop_nor = np.empty(num_loops * 3, dtype=np.float32)
+        exportMesh.loops.foreach_get('normal', loop_nor)
+        buffers['loop_nor'] = loop_nor.reshape(-1, 3)
+        buffers['loop_uvs'] = []
+        for layer in exportMesh.uv_layers:
+            uv = np.empty(num_loops * 2, dtype=np.float32)
+            layer.data.foreach_get('uv', uv)
+            buffers['loop_uvs'].append(uv.reshape(-1, 2))
+        buffers['loop_col'] = None
+        if len(exportMesh.vertex_colors) > 0:
+            loop_col = np.empty(num_loops * 3, dtype=np.float32)
+            exportMesh.vertex_colors[0].data.foreach_get('color', loop_col)
+            buffers['loop_col'] = loop_col.reshape(-1, 3)
+
+        for attrib in ('loop_start', 'loop_total', 'material_index'):
+            a = np.empty(num_polys, dtype=np.int32)
+            exportMesh.polygons.foreach_get(attrib, a)
+            buffers[attrib] = a
+        buffers['materials'] = [ma.name if ma else None for ma in exportMesh.materials]
+        buffers['export_tangents'] = self.get_export_tangents(exportMesh)
+        return buffers
+
     def ExportMesh(self, objectRef, scene):
         # This function exports a single mesh object
         bobject = objectRef[1]["objectTable"][0]
@@ -1864,22 +1848,21 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         # Check if mesh is using instanced rendering
         is_instanced, instance_offsets = self.object_process_instancing(bobject, objectRef[1]["objectTable"])
         
-        # No export necessary
+        fp = None
+        digest = None
         if ArmoryExporter.option_mesh_per_file:
             fp = self.get_meshes_file_path('mesh_' + oid)
-            assets.add(fp)
-            if self.object_is_mesh_cached(bobject) == True and os.path.exists(fp):
-                return
-
-        print ('Exporting mesh ' + bobject.data.name)
-        if len(bobject.data.vertices) > 40000:
-            print('Armory Warning: "' + bobject.name + '" contains over 40000 vertices, split mesh to smaller parts to fit into 16-bit indices')
 
         o = {}
         o['name'] = oid
         mesh = objectRef[0]
         structFlag = False;
 
+        # Deformation over the bake range, sampled later only when the mesh is not cached
+        vertex_bake = bobject.vat_bake and not bobject.find_armature()
+        if vertex_bake:
+            assets.add_khafile_def('WITH_VERTEX_ANIMATION')
+
         # Save the morph state if necessary.
         activeShapeKeyIndex = bobject.active_shape_key_index
         showOnlyShapeKey = bobject.show_only_shape_key
@@ -1929,6 +1912,8 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
 
         om = {}
         om['primitive'] = "triangles"
+        buffers = None
+        skin = None
 
         armature = bobject.find_armature()
         applyModifiers = (not armature)
@@ -1942,16 +1927,48 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         # arbitrary stage in the modifier stack.
         exportMesh = bobject.to_mesh(scene, applyModifiers, "RENDER", True, False)
 
+        # No export necessary
+        is_cached = False
+        if ArmoryExporter.option_mesh_per_file:
+            digest = self.get_mesh_digest(bobject, exportMesh, armature, instance_offsets, vertex_bake)
+            is_cached = self.object_is_mesh_cached(bobject, fp, digest) == True and os.path.exists(fp)
+        if not is_cached:
+            print ('Exporting mesh ' + bobject.data.name)
+
+        vertex_animation = None
+        if vertex_bake and not is_cached:
+            # Deformation is sampled with the morph state the scene had before export
+            morphState = (activeShapeKeyIndex, showOnlyShapeKey, currentMorphValue) if shapeKeys else None
+            vertex_samples = self.sample_vertex_animation(bobject, scene, morphState)
+            if vertex_samples is not None:
+                vertex_animation = self.get_vertex_animation(bobject, exportMesh, vertex_samples)
+
         # Process meshes
-        if ArmoryExporter.option_optimize_mesh:
+        if is_cached:
+            bpy.data.meshes.remove(exportMesh)
+        elif ArmoryExporter.option_optimize_mesh == 'Optimized':
             unifiedVertexArray = self.export_mesh_quality(exportMesh, bobject, fp, o, om)
+            vertex_indices = [ev.vertexIndex for ev in unifiedVertexArray]
             if (armature):
-                self.ExportSkinQuality(bobject, armature, unifiedVertexArray, om)
+                self.ExportSkin(bobject, armature, vertex_indices, om)
+            if vertex_animation != None:
+                lib.vertex_animation.add_vertex_animation(om, vertex_animation, vertex_indices)
+        elif ArmoryExporter.option_optimize_mesh == 'Vectorized':
+            # Raw buffers only, mesh data is built in the encoding stage
+            buffers = self.gather_mesh_buffers(exportMesh)
+            bpy.data.meshes.remove(exportMesh)
+            if (armature):
+                vertex_skin = {}
+                self.ExportSkin(bobject, armature, range(len(bobject.data.vertices)), vertex_skin)
+                skin = vertex_skin['skin']
         else:
             vert_list = self.export_mesh_fast(exportMesh, bobject, fp, o, om)
+            vertex_indices = [v.vertexIndex for v in vert_list]
             if (armature):
-                self.ExportSkinQuality(bobject, armature, vert_list, om)
+                self.ExportSkin(bobject, armature, vertex_indices, om)
                 # self.ExportSkinFast(bobject, armature, vert_list, om)
+            if vertex_animation != None:
+                lib.vertex_animation.add_vertex_animation(om, vertex_animation, vertex_indices)
 
         # Restore the morph state.
         if (shapeKeys):
@@ -1963,15 +1980,234 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
 
             mesh.update()
 
-        # Save offset data for instanced rendering
-        if is_instanced == True:
-            om['instance_offsets'] = instance_offsets
+        if is_cached:
+            assets.add(fp)
+            self.export_mesh_parts(objectRef, self.mesh_cache[os.path.basename(fp)]['parts'])
+            return
 
-        # Export usage
-        om['static_usage'] = self.get_mesh_static_usage(bobject.data)
+        # Encode in a worker process when the pool is running
+        job = {}
+        job['fp'] = fp if ArmoryExporter.option_mesh_per_file else None
+        job['oid'] = oid
+        job['om'] = om if buffers == None else None
+        job['buffers'] = buffers
+        job['skin'] = skin
+        job['vertex_animation'] = vertex_animation if buffers != None else None
+        job['options'] = self.get_mesh_encode_options(bobject, instance_offsets if is_instanced else None)
+        if self.mesh_pool != None:
+            self.mesh_jobs.append((objectRef, bobject, digest, self.mesh_pool.submit(lib.mesh_encode.encode_mesh, job)))
+        else:
+            self.finish_mesh_export(objectRef, bobject, digest, lib.mesh_encode.encode_mesh(job))
+
+    def set_morph_state(self, bobject, state):
+        shapeKeys = ArmoryExporter.GetShapeKeys(bobject.data)
+        bobject.active_shape_key_index = state[0]
+        bobject.show_only_shape_key = state[1]
+        for m in range(len(state[2])):
+            shapeKeys.key_blocks[m].value = state[2][m]
+        bobject.data.update()
+
+    def sample_vertex_animation(self, bobject, scene, morphState=None):
+        # Evaluated positions and normals of every frame in the bake range, in float32 like the source data
+        # morphState - shape key state to sample with, export state is restored afterwards
+        if morphState != None:
+            shapeKeys = ArmoryExporter.GetShapeKeys(bobject.data)
+            exportState = (bobject.active_shape_key_index, bobject.show_only_shape_key, [block.value for block in shapeKeys.key_blocks])
+            self.set_morph_state(bobject, morphState)
+        m = bobject.to_mesh(scene, True, "RENDER", True, False)
+        count = len(m.vertices)
+        bpy.data.meshes.remove(m)
+        changed = []
+        def read():
+            m = bobject.to_mesh(scene, True, "RENDER", True, False)
+            values = np.zeros(count * 6, dtype=np.float32)
+            # Topology changing deformation can not be stored as deltas
+            if len(m.vertices) == count:
+                co = np.empty(count * 3, dtype=np.float32)
+                m.vertices.foreach_get('co', co)
+                values[:count * 3] = co
+                m.vertices.foreach_get('normal', co)
+                values[count * 3:] = co
+            else:
+                changed.append(True)
+            bpy.data.meshes.remove(m)
+            return values
+        begin = bobject.vat_frame_start
+        end = max(bobject.vat_frame_end, begin)
+        samples = self.sample_timeline(scene, begin, end, read, np.zeros(count * 6, dtype=np.float32))
+        if morphState != None:
+            self.set_morph_state(bobject, exportState)
+        if len(changed) > 0:
+            print('Armory Warning: Vertex count of ' + bobject.name + ' changes over the bake range, vertex animation skipped')
+            return None
+        return samples
+
+    def get_vertex_animation(self, bobject, exportMesh, vertex_samples):
+        count = len(exportMesh.vertices)
+        if vertex_samples.shape[1] != count * 6:
+            print('Armory Warning: Vertex count of ' + bobject.name + ' differs from its rest pose, vertex animation skipped')
+            return None
+        rest = np.empty(count * 3, dtype=np.float32)
+        exportMesh.vertices.foreach_get('co', rest)
+        rest_normals = np.empty(count * 3, dtype=np.float32)
+        exportMesh.vertices.foreach_get('normal', rest_normals)
+        positions = vertex_samples[:, :count * 3].reshape(len(vertex_samples), -1, 3)
+        normals = vertex_samples[:, count * 3:].reshape(len(vertex_samples), -1, 3)
+        return lib.vertex_animation.bake(positions, normals, rest.reshape(-1, 3), rest_normals.reshape(-1, 3), bobject.vat_frame_start, 1.0 / self.frameTime)
+
+    def get_mesh_encode_options(self, bobject, instance_offsets):
+        # Everything the encoding stage needs from bpy
+        wrd = bpy.data.worlds['Arm']
+        options = {}
+        options['name'] = bobject.data.name
+        options['instance_offsets'] = instance_offsets
+        options['static_usage'] = self.get_mesh_static_usage(bobject.data)
+        options['optimize_cache'] = ArmoryExporter.option_optimize_cache
+        options['split_mesh'] = ArmoryExporter.option_split_mesh
+        options['skin_max_bones'] = ArmoryExporter.option_skin_max_bones
+        options['cluster_mesh'] = ArmoryExporter.option_cluster_mesh
+        options['quantize_mesh'] = ArmoryExporter.option_quantize_mesh
+        options['lod_generate'] = bobject.lod_generate
+        options['lod_levels'] = bobject.lod_levels
+        options['lod_ratio'] = bobject.lod_ratio
+        options['minimize'] = wrd.ArmMinimize
+        options['binary_arrays'] = wrd.ArmBinaryArrays
+        options['json_precision'] = utils.get_json_precision()
+        return options
+
+    def finish_mesh_export(self, objectRef, bobject, digest, result):
+        for line in result['log']:
+            print(line)
+        self.export_mesh_parts(objectRef, result['parts'])
+        if result['fp'] != None:
+            assets.add(result['fp'])
+            self.object_set_mesh_cached(bobject, result['fp'], digest, result['parts'])
+        else:
+            self.output['mesh_datas'] += result['mesh_datas']
 
-        o['mesh'] = om
-        self.write_mesh(bobject, fp, o)
+    def add_rna_values(self, digest, rna):
+        # Plain settings of a bpy struct, pointers are identified by name
+        for prop in rna.bl_rna.properties:
+            if prop.identifier == 'rna_type':
+                continue
+            value = getattr(rna, prop.identifier, None)
+            if isinstance(value, (bool, int, float, str)):
+                digest.add_value(prop.identifier, value)
+            elif hasattr(value, 'name'):
+                digest.add_value(prop.identifier, value.name)
+            elif hasattr(value, '__len__') and all(isinstance(v, (bool, int, float)) for v in value):
+                digest.add_value(prop.identifier, tuple(value))
+
+    def add_action_values(self, digest, animation_data):
+        # Keyframes of the active action, drivers are covered by their expressions
+        if animation_data == None:
+            digest.add_value(None)
+            return
+        action = animation_data.action
+        if action != None:
+            digest.add_value(action.name)
+            for fcurve in action.fcurves:
+                digest.add_value(fcurve.data_path, fcurve.array_index, fcurve.mute)
+                digest.add_foreach('keyframes', fcurve.keyframe_points, 'co', 2, np.float32)
+                digest.add_foreach('handles', fcurve.keyframe_points, 'handle_left', 2, np.float32)
+                digest.add_foreach('handles', fcurve.keyframe_points, 'handle_right', 2, np.float32)
+        for driver in animation_data.drivers:
+            digest.add_value(driver.data_path, driver.array_index, driver.driver.expression)
+
+    def add_vertex_bake_inputs(self, digest, bobject):
+        # Everything the baked deformation is evaluated from, so cached meshes skip the timeline sweep
+        digest.add_value(bobject.vat_frame_start, bobject.vat_frame_end, self.frameTime)
+        self.add_action_values(digest, bobject.animation_data)
+        shapeKeys = ArmoryExporter.GetShapeKeys(bobject.data)
+        if shapeKeys:
+            digest.add_value(shapeKeys.use_relative)
+            for block in shapeKeys.key_blocks:
+                digest.add_value(block.name, block.value, block.slider_min, block.slider_max, block.mute,
+                    block.relative_key.name, block.vertex_group, block.interpolation)
+                digest.add_foreach('shape_key', block.data, 'co', 3, np.float32)
+            self.add_action_values(digest, shapeKeys.animation_data)
+        # Simulation settings and point caches of modifiers such as cloth and soft body
+        for mod in bobject.modifiers:
+            for attrib in ('settings', 'collision_settings', 'point_cache'):
+                rna = getattr(mod, attrib, None)
+                if rna != None:
+                    digest.add_value(mod.name, attrib)
+                    self.add_rna_values(digest, rna)
+
+    def get_mesh_digest(self, bobject, exportMesh, armature, instance_offsets, vertex_bake=False):
+        # Covers the evaluated mesh buffers and everything else written into the mesh data
+        digest = lib.mesh_cache.Digest()
+        exportMesh.calc_normals_split()
+        digest.add_foreach('vertices', exportMesh.vertices, 'co', 3, np.float32)
+        digest.add_foreach('vertices', exportMesh.vertices, 'normal', 3, np.float32)
+        digest.add_foreach('loops', exportMesh.loops, 'vertex_index', 1, np.int32)
+        digest.add_foreach('loops', exportMesh.loops, 'normal', 3, np.float32)
+        digest.add_foreach('polygons', exportMesh.polygons, 'loop_start', 1, np.int32)
+        digest.add_foreach('polygons', exportMesh.polygons, 'loop_total', 1, np.int32)
+        digest.add_foreach('polygons', exportMesh.polygons, 'material_index', 1, np.int32)
+        digest.add_foreach('polygons', exportMesh.polygons, 'use_smooth', 1, np.bool_)
+        for layer in exportMesh.uv_layers:
+            digest.add_foreach('uv', layer.data, 'uv', 2, np.float32)
+        for layer in exportMesh.vertex_colors:
+            digest.add_foreach('color', layer.data, 'color', 3, np.float32)
+
+        # Modifier stack settings, skinned meshes are exported without applying it
+        for mod in bobject.modifiers:
+            digest.add_value(mod.type, mod.name)
+            self.add_rna_values(digest, mod)
+
+        # Materials and their tangent requirements
+        digest.add_value([slot.material.name if slot.material != None else None for slot in bobject.material_slots])
+        digest.add_value(self.get_export_tangents(bobject.data), self.get_mesh_static_usage(bobject.data))
+        digest.add_value(instance_offsets)
+
+        # Skin data
+        if armature:
+            digest.add_value(self.WriteMatrix(bobject.matrix_world), self.WriteMatrix(armature.matrix_world))
+            for bone in armature.data.bones:
+                digest.add_value(bone.name, self.WriteMatrix(bone.matrix_local))
+            digest.add_value([group.name for group in bobject.vertex_groups])
+            vertex, group, weight = self.GetVertexGroups(bobject)
+            digest.add_buffer('group_vertices', vertex)
+            digest.add_buffer('groups', group)
+            digest.add_buffer('group_weights', weight)
+
+        # Export options
+        wrd = bpy.data.worlds['Arm']
+        digest.add_value(wrd.ArmVersion, wrd.ArmMinimize, wrd.ArmBinaryArrays)
+        digest.add_value(wrd.ArmCompactJson, wrd.ArmJsonPositionPrecision, wrd.ArmJsonNormalPrecision, wrd.ArmJsonTexcoordPrecision, wrd.ArmJsonMatrixPrecision)
+        digest.add_value(ArmoryExporter.option_optimize_mesh, ArmoryExporter.option_weld_distance, ArmoryExporter.option_quantize_mesh,
+            ArmoryExporter.option_optimize_cache, ArmoryExporter.option_cluster_mesh, ArmoryExporter.option_split_mesh)
+        digest.add_value(ArmoryExporter.option_skin_influences, ArmoryExporter.option_skin_weight_bits, ArmoryExporter.option_skin_max_bones, ArmoryExporter.option_flat_skeleton)
+        digest.add_value(bobject.lod_generate, bobject.lod_levels, bobject.lod_ratio)
+        if vertex_bake:
+            self.add_vertex_bake_inputs(digest, bobject)
+        return digest.hexdigest()
+
+    def export_mesh_parts(self, objectRef, part_count):
+        # First part stays on the object, remaining parts are attached
+        # as child objects sharing its material slots
+        for bobject in objectRef[1]["objectTable"]:
+            if not bobject in self.objectToGameObjectDict:
+                continue
+            o = self.objectToGameObjectDict[bobject]
+            for i in range(1, part_count):
+                so = {}
+                so['type'] = o['type']
+                so['name'] = o['name'] + '_part' + str(i)
+                if 'visible' in o:
+                    so['visible'] = o['visible']
+                if 'spawn' in o:
+                    so['spawn'] = o['spawn']
+                so['data_ref'] = o['data_ref'] + '_part' + str(i)
+                so['material_refs'] = o['material_refs']
+                so['particle_refs'] = []
+                so['dimensions'] = o['dimensions']
+                so['transform'] = {}
+                so['transform']['values'] = self.WriteMatrix(Matrix())
+                so['traits'] = []
+                so['children'] = []
+                o['children'].append(so)
 
     def export_mesh_quality(self, exportMesh, bobject, fp, o, om):
         # Triangulate mesh and remap vertices to eliminate duplicates.
@@ -1980,7 +2216,7 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         triangleCount = len(materialTable)
 
         indexTable = []
-        unifiedVertexArray = ArmoryExporter.UnifyVertices(exportVertexArray, indexTable)
+        unifiedVertexArray = ArmoryExporter.UnifyVertices(exportVertexArray, indexTable, ArmoryExporter.option_weld_distance)
         vertexCount = len(unifiedVertexArray)
 
         # Write the position array.
@@ -2113,8 +2349,8 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         if (self.get_export_tangents(exportMesh) == True and len(exportMesh.uv_textures) > 0):  
             tana = {}
             tana['attrib'] = "tangent"
-            tana['size'] = 3
-            tana['values'] = self.calc_tangents(pa['values'], na['values'], ta['values'], om['index_arrays'][0]['values'])  
+            tana['size'] = 4
+            tana['values'] = self.calc_tangents(pa['values'], na['values'], ta['values'], [ia['values'] for ia in om['index_arrays']])  
             om['vertex_arrays'].append(tana)
 
         # Delete the new mesh that we made earlier
@@ -2336,9 +2572,26 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
                 self.ExportCamera(objectRef)
             for objectRef in self.speakerArray.items():
                 self.ExportSpeaker(objectRef)
-        for objectRef in self.meshArray.items():
-            self.output['mesh_datas'] = [];
-            self.ExportMesh(objectRef, scene)
+        # Meshes are gathered here, per-file meshes may be encoded in worker processes
+        self.mesh_pool = None
+        self.mesh_jobs = []
+        if ArmoryExporter.option_mesh_per_file:
+            self.mesh_cache = lib.mesh_cache.load(self.get_mesh_cache_path())
+            if ArmoryExporter.option_mesh_processes != 1 and len(self.meshArray) > 1:
+                self.mesh_pool = lib.mesh_encode.create_pool(ArmoryExporter.option_mesh_processes, bpy.app.binary_path_python)
+        try:
+            for objectRef in self.meshArray.items():
+                self.output['mesh_datas'] = [];
+                self.ExportMesh(objectRef, scene)
+            if self.mesh_pool != None:
+                for objectRef, bobject, digest, future in self.mesh_jobs:
+                    self.finish_mesh_export(objectRef, bobject, digest, future.result())
+        finally:
+            # Workers are separate Blender Python processes, never leave them running
+            if self.mesh_pool != None:
+                self.mesh_pool.shutdown()
+        if ArmoryExporter.option_mesh_per_file:
+            lib.mesh_cache.save(self.get_mesh_cache_path(), self.mesh_cache)
 
     def execute(self, context):
         profile_time = time.time()
@@ -2355,6 +2608,10 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         self.frameTime = 1.0 / (self.scene.render.fps_base * self.scene.render.fps)
 
         self.bobjectArray = {}
+        self.bobjectNames = {} # First exported object or bone of each name
+        self.objectSamples = None # Timeline sweeps for sampled animation
+        self.boneSamples = {}
+        self.vertexGroups = {}
         self.meshArray = {}
         self.lampArray = {}
         self.cameraArray = {}
@@ -2381,6 +2638,21 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         ArmoryExporter.option_mesh_only = self.option_mesh_only
         ArmoryExporter.option_mesh_per_file = self.option_mesh_per_file
         ArmoryExporter.option_optimize_mesh = self.option_optimize_mesh
+        ArmoryExporter.option_weld_distance = self.option_weld_distance
+        ArmoryExporter.option_quantize_mesh = self.option_quantize_mesh
+        ArmoryExporter.option_split_mesh = self.option_split_mesh
+        ArmoryExporter.option_optimize_cache = self.option_optimize_cache
+        ArmoryExporter.option_cluster_mesh = self.option_cluster_mesh
+        ArmoryExporter.option_mesh_processes = self.option_mesh_processes
+        ArmoryExporter.option_skin_influences = self.option_skin_influences
+        ArmoryExporter.option_skin_weight_bits = self.option_skin_weight_bits
+        ArmoryExporter.option_skin_max_bones = self.option_skin_max_bones
+        ArmoryExporter.option_flat_skeleton = self.option_flat_skeleton
+        ArmoryExporter.option_animation_tolerance = self.option_animation_tolerance
+        ArmoryExporter.option_animation_step = self.option_animation_step
+        ArmoryExporter.option_quantize_animation = self.option_quantize_animation
+        ArmoryExporter.option_bake_animation = self.option_bake_animation
+        ArmoryExporter.option_bake_format = self.option_bake_format
         ArmoryExporter.option_minimize = self.option_minimize
         ArmoryExporter.export_physics = False # Indicates whether rigid body is exported
 
@@ -2447,20 +2719,23 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
     def object_has_instanced_children(self, bobject):
         return bobject.instanced_children
 
-    def object_is_mesh_cached(self, bobject):
-        if bobject.type == 'FONT': # No verts for font
-            return bobject.data.mesh_cached
-        if bobject.data.mesh_cached_verts != len(bobject.data.vertices):
-            return False
-        if bobject.data.mesh_cached_edges != len(bobject.data.edges):
+    def object_is_mesh_cached(self, bobject, fp, digest):
+        # Mesh data flag is cleared on edits and by the invalidate operator
+        if bobject.data.mesh_cached == False:
             return False
-        return bobject.data.mesh_cached
+        cached = self.mesh_cache.get(os.path.basename(fp))
+        return cached != None and cached['digest'] == digest
 
-    def object_set_mesh_cached(self, bobject, b):
-        bobject.data.mesh_cached = b
-        if b and bobject.type != 'FONT':
-            bobject.data.mesh_cached_verts = len(bobject.data.vertices)
-            bobject.data.mesh_cached_edges = len(bobject.data.edges)
+    def object_set_mesh_cached(self, bobject, fp, digest, parts):
+        bobject.data.mesh_cached = True
+        entry = {}
+        entry['digest'] = digest
+        entry['parts'] = parts
+        self.mesh_cache[os.path.basename(fp)] = entry
+
+    def get_mesh_cache_path(self):
+        # Stored next to the assets directory, build/compiled for projects
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(self.filepath))), 'mesh_cache.json')
 
     def object_has_override_material(self, bobject):
         return bobject.override_material
@@ -2499,6 +2774,25 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         ArmoryExporter.option_mesh_only = False
         ArmoryExporter.option_mesh_per_file = True
         ArmoryExporter.option_optimize_mesh = bpy.data.worlds['Arm'].ArmOptimizeMesh
+        ArmoryExporter.option_weld_distance = bpy.data.worlds['Arm'].ArmMeshWeldDistance
+        ArmoryExporter.option_quantize_mesh = bpy.data.worlds['Arm'].ArmMeshQuantize
+        ArmoryExporter.option_optimize_cache = bpy.data.worlds['Arm'].ArmOptimizeVertexCache
+        ArmoryExporter.option_cluster_mesh = bpy.data.worlds['Arm'].ArmMeshClusters
+        ArmoryExporter.option_mesh_processes = bpy.data.worlds['Arm'].ArmMeshProcesses
+        ArmoryExporter.option_skin_influences = bpy.data.worlds['Arm'].ArmSkinInfluences
+        ArmoryExporter.option_skin_weight_bits = bpy.data.worlds['Arm'].ArmSkinWeightBits
+        if bpy.data.worlds['Arm'].generate_gpu_skin and bpy.data.worlds['Arm'].ArmSkinPartition:
+            ArmoryExporter.option_skin_max_bones = bpy.data.worlds['Arm'].generate_gpu_skin_max_bones
+        else:
+            ArmoryExporter.option_skin_max_bones = 0
+        ArmoryExporter.option_flat_skeleton = bpy.data.worlds['Arm'].ArmFlatSkeleton
+        ArmoryExporter.option_animation_tolerance = bpy.data.worlds['Arm'].ArmAnimationTolerance
+        ArmoryExporter.option_animation_step = bpy.data.worlds['Arm'].ArmAnimationFrameStep
+        ArmoryExporter.option_quantize_animation = bpy.data.worlds['Arm'].ArmAnimationQuantize
+        ArmoryExporter.option_bake_animation = bpy.data.worlds['Arm'].ArmBakeAnimation
+        ArmoryExporter.option_bake_format = bpy.data.worlds['Arm'].ArmBakeAnimationFormat
+        index_limit = bpy.data.worlds['Arm'].ArmMeshIndexLimit
+        ArmoryExporter.option_split_mesh = index_limit == '16-bit' or (index_limit == 'Auto' and bpy.data.worlds['Arm'].ArmProjectTarget == 'html5')
         ArmoryExporter.option_export_hide_render = bpy.data.worlds['Arm'].ArmExportHideRender
         ArmoryExporter.option_spawn_all_layers = bpy.data.worlds['Arm'].ArmSpawnAllLayers
         ArmoryExporter.option_minimize = bpy.data.worlds['Arm'].ArmMinimize
@@ -2830,6 +3124,9 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
             if len(ob.constraints) > 0 and ob.constraints[0].target != None and \
                ob.constraints[0].target.type == 'CAMERA' and ob.constraints[0].mute == False:
                 defs.append('_Billboard')
+            # Quantized vertex data decoded in vertex shaders
+            if ArmoryExporter.option_quantize_mesh != 'None':
+                defs.append('_Quantized')
 
         # Whether objects should export tangent data
         normal_mapping = '_NorTex' in defs
@@ -2934,15 +3231,13 @@ class ArmoryExporter(bpy.types.Operator, ExportHelper):
         #   shader_data_path_with_mask = 'build/compiled/ShaderDatas/' + ArmoryExporter.renderpath_id + '/' + shader_data_name_with_mask + '.arm'
         #   # Copy data if it does not exist and set stencil mask
         #   if not os.path.isfile(shader_data_path_with_mask):
-        #       json_file = open(shader_data_path).read()
-        #       json_data = json.loads(json_file)
+        #       json_data = lib.msgpack_view.materialize(lib.arm_writer.read_arm(shader_data_path))
         #       dat = json_data['shader_datas'][0]
         #       dat['name'] += mask_ext
         #       for c in dat['contexts']:
         #           c['stencil_pass'] = 'replace'
         #           c['stencil_reference_value'] = material.stencil_mask
-        #       with open(shader_data_path_with_mask, 'w') as f:
-        #           json.dump(json_data, f)
+        #       utils.write_arm(shader_data_path_with_mask, json_data)
         #   ArmoryExporter.asset_references.append(shader_data_path_with_mask)
         #   o.shader = shader_data_name_with_mask + '/' + shader_data_name_with_mask
         # # No stencil mask
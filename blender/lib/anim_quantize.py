@@ -0,0 +1,75 @@
+# Quantized encoding of translation, rotation and scale animation tracks
+# Operates on tracks produced by lib.keyframes, no bpy access
+import numpy as np
+
+# Largest magnitude of the three smaller quaternion components
+rotation_range = np.sqrt(0.5)
+rotation_max = 2**15 - 1
+unorm_max = 2**16 - 1
+
+def quantize_range(values):
+    # Unorm16 normalized to track bounds, decode as value / 65535 * scale + offset
+    offset = values.min(axis=0)
+    scale = values.max(axis=0) - offset
+    scale[scale == 0.0] = 1.0
+    q = np.round((values - offset) / scale * unorm_max).astype(np.int64)
+    decoded = q / unorm_max * scale + offset
+    return q, offset, scale, np.abs(decoded - values).max()
+
+def quantize_rotations(quats):
+    # Smallest three in 48 bits, 2 bits index of the dropped largest component followed
+    # by the other three as 15-bit values, split into three uint16 words high to low
+    # Components decode as value / 32767 * 2 * sqrt(0.5) - sqrt(0.5), the dropped one is positive
+    rows = np.arange(len(quats))
+    largest = np.abs(quats).argmax(axis=1)
+    quats = quats * np.where(quats[rows, largest] < 0.0, -1.0, 1.0)[:, None]
+    keep = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    rest = quats[rows[:, None], keep]
+    q = np.round((np.clip(rest, -rotation_range, rotation_range) + rotation_range) / (2 * rotation_range) * rotation_max).astype(np.int64)
+    packed = (largest << 45) | (q[:, 0] << 30) | (q[:, 1] << 15) | q[:, 2]
+    words = np.stack(((packed >> 32) & 0xffff, (packed >> 16) & 0xffff, packed & 0xffff), axis=1)
+
+    decoded_rest = q / rotation_max * (2 * rotation_range) - rotation_range
+    decoded = np.zeros(quats.shape)
+    decoded[rows[:, None], keep] = decoded_rest
+    decoded[rows, largest] = np.sqrt(np.maximum(1.0 - (decoded_rest * decoded_rest).sum(axis=1), 0.0))
+    dot = np.clip(np.abs((decoded * quats).sum(axis=1)), 0.0, 1.0)
+    return words, 2.0 * np.arccos(dot).max()
+
+def encode_time(times, epsilon=1e-6):
+    # Uniform key times are stored as start, step and count
+    to = {}
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) > 1:
+        steps = np.diff(times)
+        if np.abs(steps - steps[0]).max() <= epsilon * max(abs(steps[0]), 1.0):
+            to['start'] = float(times[0])
+            to['step'] = float(steps[0])
+            to['count'] = len(times)
+            return to
+    to['values'] = times.tolist()
+    return to
+
+def quantize_track(tracko):
+    # Quantizes a translation, rotation or scale track in place, returns max error
+    if tracko['target'] == 'rotation':
+        size = 4
+    else:
+        size = 3
+    values = np.array(tracko['value']['values'], dtype=np.float64).reshape(-1, size)
+    vo = {}
+    vo['type'] = 'uint16'
+    if tracko['target'] == 'rotation':
+        q, err = quantize_rotations(values)
+        vo['encoding'] = 'smallest_three'
+        # Decoded keys may flip sign, segments are never longer than 180 degrees
+        vo['interpolation'] = 'shortest_path'
+    else:
+        q, offset, scale, err = quantize_range(values)
+        vo['offset'] = offset.tolist()
+        vo['scale'] = scale.tolist()
+    vo['size'] = 3
+    vo['values'] = q.ravel().tolist()
+    tracko['value'] = vo
+    tracko['time'] = encode_time(tracko['time']['values'])
+    return float(err)
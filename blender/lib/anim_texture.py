@@ -0,0 +1,31 @@
+# Animation textures with baked bone palettes for instanced skinning
+# One row per frame, three RGBA texels per bone holding the top rows of its skinning matrix
+# Operates on sampled arrays, no bpy access
+import numpy as np
+
+def bake_palettes(pose, inverse_bind):
+    # pose - (frames, bones, 4, 4) armature space pose matrices
+    # inverse_bind - (bones, 4, 4) inverse rest matrices in the same space
+    # Returns (frames, bones * 3, 4) texels
+    m = np.matmul(pose, inverse_bind[None])
+    return m[:, :, :3, :].reshape(len(pose), -1, 4)
+
+def texture_data(name, texels, begin_frame, frame_rate, encoding):
+    # Metadata and texel values, float16 is stored as half float bit patterns
+    o = {}
+    o['name'] = name
+    o['frame_count'] = texels.shape[0]
+    o['bone_count'] = texels.shape[1] // 3
+    o['begin_frame'] = begin_frame
+    o['frame_rate'] = frame_rate
+    o['width'] = texels.shape[1]
+    o['height'] = texels.shape[0]
+    if encoding == 'Float16':
+        o['format'] = 'RGBA64'
+        o['type'] = 'float16'
+        o['values'] = texels.astype(np.float16).view(np.uint16).ravel().tolist()
+    else:
+        o['format'] = 'RGBA128'
+        o['type'] = 'float32'
+        o['values'] = texels.ravel().tolist()
+    return o
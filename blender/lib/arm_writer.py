@@ -0,0 +1,34 @@
+# Writes and reads back .arm files without touching bpy, usable from worker processes
+import json
+import lib.block_compress
+import lib.json_stream
+import lib.msgpack_stream
+import lib.msgpack_view
+
+def write_arm(filepath, output, minimize, binary_arrays=False, json_precision=None):
+    if minimize:
+        # Streamed, typed arrays are encoded on the fly instead of packing a copy of the output
+        with open(filepath, 'wb') as f:
+            lib.msgpack_stream.dump(output, f, binary_arrays)
+    elif json_precision != None:
+        with open(filepath, 'w') as f:
+            lib.json_stream.dump(output, f, json_precision)
+    else:
+        with open(filepath, 'w') as f:
+            # f.write(json.dumps(output, separators=(',',':')))
+            f.write(json.dumps(output, sort_keys=True, indent=4))
+
+def read_arm(filepath):
+    # Minimized files are decoded lazily from a memory map, see lib.msgpack_view
+    with open(filepath, 'rb') as f:
+        head = f.read(len(lib.block_compress.magic))
+    if lib.block_compress.is_compressed(head):
+        with open(filepath, 'rb') as f:
+            data = lib.block_compress.unwrap(f.read())
+        if data[:1] == b'{':
+            return json.loads(data.decode('utf-8'))
+        return lib.msgpack_view.loads(data)
+    if head[:1] == b'{':
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    return lib.msgpack_view.load_file(filepath)
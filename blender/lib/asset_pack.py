@@ -0,0 +1,158 @@
+# Asset packs, many compiled files stored in one blob with a table of contents
+# Layout: 32 byte header, 16 byte aligned entry blobs, msgpack table of contents at the end
+# The header points to the table so entries can be appended while writing, no bpy access
+import hashlib
+import json
+import mmap
+import os
+import struct
+import lib.block_compress
+import lib.msgpack_stream
+import lib.msgpack_view
+
+magic = b'ARMPACK\x00'
+pack_version = 1
+# magic, version, entry count, table offset, table length
+header_format = '<8sIIQQ'
+header_size = struct.calcsize(header_format)
+alignment = 16
+
+class PackWriter:
+    # Appends entries to a new pack file, close writes the table and header
+
+    def __init__(self, filepath):
+        self.f = open(filepath, 'wb')
+        self.f.write(b'\x00' * header_size)
+        self.pos = header_size
+        self.entries = []
+        self.names = set()
+
+    def add(self, name, data, asset_type, codec='none', raw=None):
+        # data - stored blob, raw - uncompressed contents when codec is not none
+        if raw == None:
+            raw = data
+        if name in self.names:
+            raise ValueError('Duplicate pack entry ' + name)
+        pad = -self.pos % alignment
+        if pad > 0:
+            self.f.write(b'\x00' * pad)
+            self.pos += pad
+        entry = {}
+        entry['name'] = name
+        entry['type'] = asset_type
+        entry['offset'] = self.pos
+        entry['length'] = len(data)
+        entry['codec'] = codec
+        entry['size'] = len(raw)
+        entry['hash'] = hashlib.md5(raw).hexdigest()
+        self.f.write(data)
+        self.pos += len(data)
+        self.entries.append(entry)
+        self.names.add(name)
+        return entry
+
+    def add_file(self, name, filepath, asset_type):
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        return self.add(name, data, data_type(data, asset_type))
+
+    def close(self):
+        toc = lib.msgpack_stream.packb(self.entries)
+        self.f.write(toc)
+        self.f.seek(0)
+        self.f.write(struct.pack(header_format, magic, pack_version, len(self.entries), self.pos, len(toc)))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type == None:
+            self.close()
+        else:
+            self.f.close()
+
+class PackReader:
+    # Maps a pack read-only, entries are sliced out without reading the rest of the file
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mv = memoryview(self.data)
+        if len(self.mv) < header_size:
+            raise ValueError('Not an asset pack: ' + filepath)
+        tag, version, count, toc_offset, toc_length = struct.unpack_from(header_format, self.mv, 0)
+        if tag != magic or version != pack_version:
+            raise ValueError('Not an asset pack: ' + filepath)
+        self.entries = {}
+        for entry in lib.msgpack_view.materialize(lib.msgpack_view.loads(self.mv[toc_offset:toc_offset + toc_length])):
+            self.entries[entry['name']] = entry
+
+    def read(self, name):
+        # Memoryview of the stored entry blob
+        entry = self.entries[name]
+        return self.mv[entry['offset']:entry['offset'] + entry['length']]
+
+    def read_data(self, name):
+        # Uncompressed entry contents, a view into the pack for raw entries
+        codec = self.entries[name].get('codec', 'none')
+        if codec == 'none':
+            return self.read(name)
+        return lib.block_compress.decompress(self.read(name), codec)
+
+    def load(self, name):
+        # Lazily decoded .arm entry, see lib.msgpack_view
+        data = self.read_data(name)
+        if self.entries[name]['type'] == 'json':
+            return json.loads(bytes(data).decode('utf-8'))
+        return lib.msgpack_view.loads(data)
+
+    def verify(self, name):
+        return hashlib.md5(self.read_data(name)).hexdigest() == self.entries[name]['hash']
+
+def data_type(data, asset_type):
+    # Data files written without minimize are JSON
+    if asset_type == 'arm' and data[:1] == b'{':
+        return 'json'
+    return asset_type
+
+def entry_name(filepath):
+    # Assets are looked up by file name without extension, like Kha asset names
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def write_packs(files, compiled_dir, pack_dir, codec='none', threshold=0, cache_dir=None):
+    # Packs existing .arm files found under compiled_dir, one pack per top level directory
+    # Entries are compressed with codec, see lib.block_compress
+    # Returns the written pack paths and the files they hold
+    groups = {}
+    for file in files:
+        rel = os.path.relpath(file, compiled_dir).replace('\\', '/')
+        if not file.endswith('.arm') or rel.startswith('../') or '/' not in rel or not os.path.isfile(file):
+            continue
+        groups.setdefault(rel.split('/')[0], []).append(file)
+    if len(groups) > 0 and not os.path.exists(pack_dir):
+        os.makedirs(pack_dir)
+    packs = []
+    packed = []
+    used = set()
+    for group in sorted(groups):
+        pack_path = pack_dir + '/' + group.lower() + '.pack'
+        sources = []
+        names = set()
+        for file in sorted(set(groups[group])):
+            # Clashing names stay separate files
+            if entry_name(file) not in names:
+                sources.append(file)
+                names.add(entry_name(file))
+        blocks = []
+        for file in sources:
+            with open(file, 'rb') as f:
+                blocks.append(f.read())
+        compressed = lib.block_compress.compress_blocks(blocks, codec, threshold, cache_dir, used=used)
+        with PackWriter(pack_path) as w:
+            for file, data, (block_codec, payload) in zip(sources, blocks, compressed):
+                w.add(entry_name(file), payload, data_type(data, 'arm'), block_codec, data)
+                packed.append(file)
+        packs.append(pack_path)
+    lib.block_compress.prune_cache(cache_dir, used)
+    return packs, packed
@@ -0,0 +1,133 @@
+# Per-block compression of exported assets with stdlib codecs
+# Blocks are compressed in a thread pool since zlib and lzma release the GIL,
+# results are cached on disk by content hash so unchanged blocks are not compressed again, no bpy access
+import concurrent.futures
+import hashlib
+import lzma
+import os
+import struct
+import zlib
+
+# Codec ids stored in compressed asset headers
+codec_ids = {'none': 0, 'zlib': 1, 'lzma': 2}
+codec_names = dict((i, name) for name, i in codec_ids.items())
+levels = {'zlib': 9, 'lzma': 6}
+# Blocks that do not shrink below this fraction of their size are kept raw
+max_ratio = 0.9
+
+# Standalone compressed asset: magic, codec id, uncompressed size
+magic = b'ARMZ'
+header_format = '<4sB3xQ'
+header_size = struct.calcsize(header_format)
+
+def compress(data, codec):
+    if codec == 'zlib':
+        return zlib.compress(data, levels['zlib'])
+    return lzma.compress(data, preset=levels['lzma'])
+
+def decompress(data, codec):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    elif codec == 'lzma':
+        return lzma.decompress(data)
+    return bytes(data)
+
+def is_compressed(data):
+    return bytes(data[:len(magic)]) == magic
+
+def unwrap(data):
+    # Contents of a standalone compressed asset
+    tag, codec_id, size = struct.unpack_from(header_format, data, 0)
+    return decompress(data[header_size:], codec_names[codec_id])
+
+class BlockCache:
+    # One file per compressed block named by content hash and codec, empty files mark blocks kept raw
+
+    def __init__(self, cache_dir, codec):
+        self.cache_dir = cache_dir
+        self.codec = codec
+        # Names of cache files referenced by this build
+        self.used = set()
+        if cache_dir != None and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def path(self, data):
+        name = hashlib.md5(data).hexdigest() + '.' + self.codec + str(levels[self.codec])
+        self.used.add(name)
+        return os.path.join(self.cache_dir, name)
+
+    def get(self, data):
+        if self.cache_dir == None:
+            return None
+        path = self.path(data)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put(self, data, payload):
+        if self.cache_dir != None:
+            with open(self.path(data), 'wb') as f:
+                f.write(payload)
+
+def compress_block(data, codec, threshold, cache):
+    # Returns (codec, payload), blocks below threshold or compressing poorly stay raw
+    if codec == 'none' or len(data) < threshold:
+        return 'none', data
+    payload = cache.get(data)
+    if payload == None:
+        payload = compress(data, codec)
+        if len(payload) > len(data) * max_ratio:
+            payload = b''
+        cache.put(data, payload)
+    if len(payload) == 0:
+        return 'none', data
+    return codec, payload
+
+def compress_blocks(blocks, codec, threshold, cache_dir=None, threads=0, used=None):
+    # Compresses a list of byte blocks in parallel, results keep the order of blocks
+    # used - set collecting the cache files referenced by the blocks, see prune_cache
+    cache = BlockCache(cache_dir, codec)
+    if threads == 0:
+        threads = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        res = list(pool.map(lambda data: compress_block(data, codec, threshold, cache), blocks))
+    if used != None:
+        used.update(cache.used)
+    return res
+
+def prune_cache(cache_dir, used):
+    # Removes cached blocks of asset versions the current build no longer references
+    if cache_dir == None or not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name not in used:
+            os.remove(os.path.join(cache_dir, name))
+
+def write_compressed(files, compiled_dir, out_dir, codec, threshold, cache_dir=None):
+    # Writes compressed copies of .arm files under compiled_dir to the same relative path in out_dir
+    # Returns a map of replaced files to their compressed copies, files kept raw are left out
+    sources = []
+    for file in files:
+        rel = os.path.relpath(file, compiled_dir).replace('\\', '/')
+        if file.endswith('.arm') and not rel.startswith('../') and os.path.isfile(file):
+            sources.append((file, rel))
+    blocks = []
+    for file, rel in sources:
+        with open(file, 'rb') as f:
+            blocks.append(f.read())
+    replaced = {}
+    used = set()
+    compressed = compress_blocks(blocks, codec, threshold, cache_dir, used=used)
+    prune_cache(cache_dir, used)
+    for (file, rel), data, (block_codec, payload) in zip(sources, blocks, compressed):
+        if block_codec == 'none':
+            continue
+        path = out_dir + '/' + rel
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(struct.pack(header_format, magic, codec_ids[block_codec], len(data)))
+            f.write(payload)
+        replaced[file] = path
+    return replaced
@@ -0,0 +1,112 @@
+# Streaming JSON writer for readable .arm files
+# Structure is pretty-printed like json.dumps(sort_keys=True, indent=4), numeric arrays are written on one line
+# with floats rounded to a per-field precision, e.g. positions, normals, texcoords and matrices
+import json
+import math
+import numpy as np
+import lib.typed_arrays
+
+chunk_size = 4096
+indent = '    '
+
+# Precision classes of vertex arrays by attribute
+attrib_fields = {'position': 'position', 'normal': 'normal', 'tangent': 'normal', 'texcoord': 'texcoord', 'texcoord1': 'texcoord'}
+# Precision classes of values below these keys
+key_fields = {'transform': 'matrix', 'transforms': 'matrix', 'inverse_binds': 'matrix', 'value': 'matrix',
+              'translations': 'matrix', 'rotations': 'matrix', 'scales': 'matrix'}
+
+def float_repr(v):
+    # Same as the json module, including non-finite values
+    if v != v:
+        return 'NaN'
+    elif v == float('inf'):
+        return 'Infinity'
+    elif v == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(v)
+
+def float_fixed(v, digits):
+    # Rounded to digits decimals with trailing zeros dropped, stays a float literal
+    if math.isinf(v) or v != v:
+        return float_repr(v)
+    s = '%.*f' % (digits, v)
+    if '.' in s:
+        s = s.rstrip('0')
+        if s.endswith('.'):
+            s += '0'
+    else:
+        # No decimals requested
+        s += '.0'
+    return s
+
+class JsonWriter:
+    # Writes straight to a text file object, no string of the whole output is built
+
+    def __init__(self, f, precision=None):
+        # precision - decimals per field class, classes missing from it keep full precision
+        self.f = f
+        self.precision = precision if precision != None else {}
+
+    def write(self, obj):
+        self.write_value(obj, None, 0)
+
+    def format_float(self, field):
+        digits = self.precision.get(field) if field != None else None
+        if digits == None:
+            return float_repr
+        return lambda v: float_fixed(v, digits)
+
+    def write_value(self, obj, field, depth):
+        if isinstance(obj, np.ndarray):
+            obj = obj.tolist()
+        if isinstance(obj, dict):
+            self.write_map(obj, field, depth)
+        elif isinstance(obj, list) or isinstance(obj, tuple):
+            if lib.typed_arrays.is_numeric(obj):
+                self.write_numbers(obj, field)
+            else:
+                self.write_array(obj, field, depth)
+        elif type(obj) is float:
+            self.f.write(self.format_float(field)(obj))
+        else:
+            self.f.write(json.dumps(obj))
+
+    def write_map(self, obj, field, depth):
+        if len(obj) == 0:
+            self.f.write('{}')
+            return
+        attrib = obj.get('attrib')
+        if isinstance(attrib, str) and attrib in attrib_fields:
+            field = attrib_fields[attrib]
+        pad = '\n' + indent * (depth + 1)
+        self.f.write('{')
+        keys = sorted(obj.keys(), key=str)
+        for i, k in enumerate(keys):
+            self.f.write(pad if i == 0 else ',' + pad)
+            self.f.write(json.dumps(k if isinstance(k, str) else str(k)) + ': ')
+            self.write_value(obj[k], key_fields.get(k, field), depth + 1)
+        self.f.write('\n' + indent * depth + '}')
+
+    def write_array(self, values, field, depth):
+        if len(values) == 0:
+            self.f.write('[]')
+            return
+        pad = '\n' + indent * (depth + 1)
+        self.f.write('[')
+        for i, v in enumerate(values):
+            self.f.write(pad if i == 0 else ',' + pad)
+            self.write_value(v, field, depth + 1)
+        self.f.write('\n' + indent * depth + ']')
+
+    def write_numbers(self, values, field):
+        # Compact single line, ints are written as is
+        fmt = self.format_float(field)
+        self.f.write('[')
+        for i in range(0, len(values), chunk_size):
+            if i > 0:
+                self.f.write(',')
+            self.f.write(','.join([fmt(v) if type(v) is float else str(v) for v in values[i:i + chunk_size]]))
+        self.f.write(']')
+
+def dump(obj, f, precision=None):
+    JsonWriter(f, precision).write(obj)
@@ -0,0 +1,126 @@
+# Keyframe reduction of sampled matrix tracks
+# Matrices are decomposed into translation, rotation and scale channels, each keeping
+# only keys that interpolation between their neighbours can not reproduce
+# Operates on sampled arrays, no bpy access
+import numpy as np
+
+def decompose(matrices):
+    # Translation, unit quaternion in x, y, z, w order and scale of (n, 4, 4) matrices
+    loc = matrices[:, :3, 3].copy()
+    basis = matrices[:, :3, :3]
+    scale = np.sqrt((basis * basis).sum(axis=1))
+    # Mirrored bases get a negative x scale, as in mathutils
+    scale[np.linalg.det(basis) < 0, 0] *= -1
+    scale[scale == 0] = 1e-12
+    rot = basis / scale[:, None, :]
+    return loc, matrix_to_quat(rot), scale
+
+def matrix_to_quat(m):
+    # Branch on the largest diagonal term for precision
+    n = len(m)
+    q = np.zeros((n, 4))
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    diag = np.stack((m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]), axis=1)
+    case = np.where(trace > diag.max(axis=1), 3, diag.argmax(axis=1))
+
+    c = case == 3
+    s = np.sqrt(1.0 + trace[c]) * 2
+    q[c, 3] = 0.25 * s
+    q[c, 0] = (m[c, 2, 1] - m[c, 1, 2]) / s
+    q[c, 1] = (m[c, 0, 2] - m[c, 2, 0]) / s
+    q[c, 2] = (m[c, 1, 0] - m[c, 0, 1]) / s
+    c = case == 0
+    s = np.sqrt(1.0 + m[c, 0, 0] - m[c, 1, 1] - m[c, 2, 2]) * 2
+    q[c, 3] = (m[c, 2, 1] - m[c, 1, 2]) / s
+    q[c, 0] = 0.25 * s
+    q[c, 1] = (m[c, 0, 1] + m[c, 1, 0]) / s
+    q[c, 2] = (m[c, 0, 2] + m[c, 2, 0]) / s
+    c = case == 1
+    s = np.sqrt(1.0 + m[c, 1, 1] - m[c, 0, 0] - m[c, 2, 2]) * 2
+    q[c, 3] = (m[c, 0, 2] - m[c, 2, 0]) / s
+    q[c, 0] = (m[c, 0, 1] + m[c, 1, 0]) / s
+    q[c, 1] = 0.25 * s
+    q[c, 2] = (m[c, 1, 2] + m[c, 2, 1]) / s
+    c = case == 2
+    s = np.sqrt(1.0 + m[c, 2, 2] - m[c, 0, 0] - m[c, 1, 1]) * 2
+    q[c, 3] = (m[c, 1, 0] - m[c, 0, 1]) / s
+    q[c, 0] = (m[c, 0, 2] + m[c, 2, 0]) / s
+    q[c, 1] = (m[c, 1, 2] + m[c, 2, 1]) / s
+    q[c, 2] = 0.25 * s
+    q /= np.sqrt((q * q).sum(axis=1))[:, None]
+    # Shortest path between consecutive keys
+    for i in range(1, n):
+        if np.dot(q[i], q[i - 1]) < 0.0:
+            q[i] = -q[i]
+    return q
+
+def lerp(a, b, t):
+    return a + (b - a) * t[:, None]
+
+def slerp(a, b, t):
+    d = np.clip(np.dot(a, b), -1.0, 1.0)
+    if d > 0.9995:
+        res = lerp(a, b, t)
+    else:
+        theta = np.arccos(d)
+        res = (np.sin((1.0 - t) * theta)[:, None] * a + np.sin(t * theta)[:, None] * b) / np.sin(theta)
+    return res / np.sqrt((res * res).sum(axis=1))[:, None]
+
+def vector_error(values, approx):
+    return np.sqrt(((values - approx) ** 2).sum(axis=1))
+
+def angle_error(values, approx):
+    # Rotation angle between quaternions, in radians
+    d = np.clip(np.abs((values * approx).sum(axis=1)), 0.0, 1.0)
+    return 2.0 * np.arccos(d)
+
+def same_hemisphere(a, b):
+    # Segments between opposite quaternions would need more than 180 degrees of
+    # rotation, which shortest path slerp at runtime plays the other way around
+    return np.dot(a, b) >= 0.0
+
+def reduce_keys(times, values, tolerance, interpolate, error, valid=None):
+    # Greedy pass keeping a key once the segment from the last kept key
+    # can no longer reproduce the skipped keys within tolerance
+    # valid - optional test of segment end values, failing segments are split as well
+    # Returns indices of kept keys, first and last are always kept
+    n = len(times)
+    if n <= 2:
+        return list(range(n))
+    keep = [0]
+    a = 0
+    b = a + 2
+    while b < n:
+        inner = np.arange(a + 1, b)
+        t = (times[inner] - times[a]) / (times[b] - times[a])
+        if (valid != None and not valid(values[a], values[b])) or error(values[inner], interpolate(values[a], values[b], t)).max() > tolerance:
+            a = b - 1
+            keep.append(a)
+        b += 1
+    keep.append(n - 1)
+    return keep
+
+def channel_track(target, times, values, keep):
+    tracko = {}
+    tracko['target'] = target
+    tracko['time'] = {}
+    tracko['time']['values'] = times[keep].tolist()
+    tracko['value'] = {}
+    tracko['value']['values'] = values[keep].ravel().tolist()
+    return tracko
+
+def reduce_track(matrices, times, tolerance, step=1):
+    # Translation, rotation and scale tracks with sparse key times
+    # matrices - (n, 4, 4) samples, times - key time of every sample
+    # step - keeps every step-th sample before reduction, the last sample is always kept
+    times = np.asarray(times, dtype=np.float64)
+    frames = list(range(0, len(times), step))
+    if frames[-1] != len(times) - 1:
+        frames.append(len(times) - 1)
+    times = times[frames]
+    loc, rot, scale = decompose(matrices[frames])
+    tracks = []
+    tracks.append(channel_track('translation', times, loc, reduce_keys(times, loc, tolerance, lerp, vector_error)))
+    tracks.append(channel_track('rotation', times, rot, reduce_keys(times, rot, tolerance, slerp, angle_error, same_hemisphere)))
+    tracks.append(channel_track('scale', times, scale, reduce_keys(times, scale, tolerance, lerp, vector_error)))
+    return tracks
@@ -0,0 +1,176 @@
+# Array helpers for the vectorized mesh exporter
+# Operates on raw buffers only, no bpy access
+import numpy as np
+
+def unique_rows(a):
+    # Finds identical rows of a 2D array
+    # Returns index of the first occurrence of each unique row and the
+    # unique row number for every input row, numbered in order of first occurrence
+    # Signed zeros compare equal, same as mathutils vectors
+    if a.dtype.kind == 'f':
+        a = a + a.dtype.type(0.0)
+    a = np.ascontiguousarray(a)
+    if len(a) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rows = a.view(np.dtype((np.void, a.dtype.itemsize * a.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+def triangulate(loop_start, loop_total):
+    # Triangulates polygons in batch, matching export_mesh_fast:
+    # triangles are kept as they are, n-gons are fanned around their last loop
+    # Returns (T, 3) array of loop indices and polygon index of each triangle
+    loop_start = np.asarray(loop_start, dtype=np.int64)
+    loop_total = np.asarray(loop_total, dtype=np.int64)
+    tri_count = np.maximum(loop_total - 2, 0)
+    tri_poly = np.repeat(np.arange(len(loop_total)), tri_count)
+    tri_first = np.cumsum(tri_count) - tri_count
+    local = np.arange(len(tri_poly)) - np.repeat(tri_first, tri_count)
+    start = loop_start[tri_poly]
+    total = loop_total[tri_poly]
+    fan = total > 3
+    tris = np.empty((len(tri_poly), 3), dtype=np.int64)
+    tris[:, 0] = np.where(fan, start + total - 1, start)
+    tris[:, 1] = np.where(fan, start + local, start + 1)
+    tris[:, 2] = np.where(fan, start + local + 1, start + 2)
+    return tris, tri_poly
+
+def split_by_material(tris, tri_mat, mat_count):
+    # Splits triangle list into per-material index lists, keeping triangle order
+    return [tris[tri_mat == m].ravel() for m in range(mat_count)]
+
+def calc_tangents(posa, nora, uva, index_arrays):
+    # Per-vertex tangents with handedness, accumulated over triangles of all index arrays
+    # Returns (N, 4) array, w is -1.0 for mirrored uvs
+    pos = np.asarray(posa, dtype=np.float64).reshape(-1, 3)
+    nor = np.asarray(nora, dtype=np.float64).reshape(-1, 3)
+    uv = np.asarray(uva, dtype=np.float64).reshape(-1, 2)
+    vertex_count = len(pos)
+    if len(index_arrays) > 0:
+        tris = np.concatenate([np.asarray(ia, dtype=np.int64) for ia in index_arrays]).reshape(-1, 3)
+    else:
+        tris = np.zeros((0, 3), dtype=np.int64)
+
+    # Per-triangle tangent and bitangent
+    v0, v1, v2 = pos[tris[:, 0]], pos[tris[:, 1]], pos[tris[:, 2]]
+    uv0, uv1, uv2 = uv[tris[:, 0]], uv[tris[:, 1]], uv[tris[:, 2]]
+    deltaPos1 = v1 - v0
+    deltaPos2 = v2 - v0
+    deltaUV1 = uv1 - uv0
+    deltaUV2 = uv2 - uv0
+    d = deltaUV1[:, 0] * deltaUV2[:, 1] - deltaUV1[:, 1] * deltaUV2[:, 0]
+    r = np.ones(len(d))
+    np.divide(1.0, d, out=r, where=d != 0)
+    r = r[:, None]
+    tri_tan = (deltaPos1 * deltaUV2[:, 1:2] - deltaPos2 * deltaUV1[:, 1:2]) * r
+    tri_bitan = (deltaPos2 * deltaUV1[:, 0:1] - deltaPos1 * deltaUV2[:, 0:1]) * r
+
+    # Accumulate to vertices
+    flat = tris.ravel()
+    tangents = np.empty((vertex_count, 3))
+    bitangents = np.empty((vertex_count, 3))
+    for c in range(3):
+        tangents[:, c] = np.bincount(flat, weights=np.repeat(tri_tan[:, c], 3), minlength=vertex_count)
+        bitangents[:, c] = np.bincount(flat, weights=np.repeat(tri_bitan[:, c], 3), minlength=vertex_count)
+
+    # Orthogonalize
+    t = tangents - nor * np.sum(nor * tangents, axis=1)[:, None]
+    length = np.sqrt(np.sum(t * t, axis=1))
+    np.divide(t, length[:, None], out=t, where=length[:, None] != 0)
+
+    # Calculate handedness, uvs come in with reversed TCY so flip bitangent back
+    w = np.where(np.sum(np.cross(nor, t) * -bitangents, axis=1) < 0.0, -1.0, 1.0)
+    return np.hstack((t, w[:, None]))
+
+def encode_buffers(buffers, om):
+    # Builds vertex and index arrays of mesh data from gathered mesh buffers
+    # Returns source vertex of each exported vertex, used for skinning
+    co = buffers['co']
+    loop_vi = buffers['loop_vi']
+    loop_nor = buffers['loop_nor']
+    loop_uvs = buffers['loop_uvs']
+    loop_col = buffers['loop_col']
+    materials = buffers['materials']
+
+    # Loops sharing position, normal and all uv layers become one vertex
+    loop_co = co[loop_vi]
+    first, loop_to_vert = unique_rows(np.hstack([loop_co, loop_nor] + loop_uvs))
+
+    # Output
+    om['vertex_arrays'] = []
+    pa = {}
+    pa['attrib'] = "position"
+    pa['size'] = 3
+    pa['values'] = loop_co[first].ravel().tolist()
+    om['vertex_arrays'].append(pa)
+    na = {}
+    na['attrib'] = "normal"
+    na['size'] = 3
+    na['values'] = loop_nor[first].ravel().tolist()
+    om['vertex_arrays'].append(na)
+    if len(loop_uvs) > 0:
+        t0 = loop_uvs[0][first].astype(np.float64)
+        t0[:, 1] = 1.0 - t0[:, 1] # Reverse TCY
+        ta = {}
+        ta['attrib'] = "texcoord"
+        ta['size'] = 2
+        ta['values'] = t0.ravel().tolist()
+        om['vertex_arrays'].append(ta)
+        if len(loop_uvs) > 1:
+            ta2 = {}
+            ta2['attrib'] = "texcoord1"
+            ta2['size'] = 2
+            ta2['values'] = loop_uvs[1][first].ravel().tolist()
+            om['vertex_arrays'].append(ta2)
+    if loop_col is not None:
+        ca = {}
+        ca['attrib'] = "color"
+        ca['size'] = 3
+        ca['values'] = loop_col[first].ravel().tolist()
+        om['vertex_arrays'].append(ca)
+
+    # Indices
+    tris, tri_poly = triangulate(buffers['loop_start'], buffers['loop_total'])
+    tris = loop_to_vert[tris]
+
+    # Slots sharing a material name share one index array
+    prim_names = []
+    slot_to_prim = []
+    for name in materials:
+        name = name if name != None else ''
+        if name not in prim_names:
+            prim_names.append(name)
+        slot_to_prim.append(prim_names.index(name))
+    if len(prim_names) == 0:
+        prim_names = ['']
+        slot_to_prim = [0]
+    tri_prim = np.array(slot_to_prim, dtype=np.int64)[buffers['material_index'][tri_poly]]
+    prims = split_by_material(tris, tri_prim, len(prim_names))
+
+    # Write indices
+    om['index_arrays'] = []
+    for mat, prim in zip(prim_names, prims):
+        ia = {}
+        ia['size'] = 3
+        ia['values'] = prim.tolist()
+        ia['material'] = 0
+        # Find material index for multi-mat mesh
+        if len(materials) > 1:
+            for i in range(0, len(materials)):
+                if materials[i] != None and mat == materials[i]:
+                    ia['material'] = i
+                    break
+        om['index_arrays'].append(ia)
+
+    # Make tangents
+    if buffers['export_tangents'] == True and len(loop_uvs) > 0:
+        tana = {}
+        tana['attrib'] = "tangent"
+        tana['size'] = 4
+        tana['values'] = calc_tangents(pa['values'], na['values'], ta['values'], [ia['values'] for ia in om['index_arrays']]).ravel().tolist()
+        om['vertex_arrays'].append(tana)
+
+    return loop_vi[first]
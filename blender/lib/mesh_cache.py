@@ -0,0 +1,53 @@
+# Content hash cache of exported meshes
+# The manifest maps mesh files to a digest of everything they were exported from,
+# a mesh is skipped only when the digest matches and its file still exists
+import hashlib
+import json
+import os
+import numpy as np
+
+# Bump when exported mesh data changes for identical input
+manifest_version = 1
+
+def load(path):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != manifest_version:
+        return {}
+    return manifest.get('meshes', {})
+
+def save(path, meshes):
+    manifest = {}
+    manifest['version'] = manifest_version
+    manifest['meshes'] = meshes
+    with open(path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+
+class Digest:
+    # Accumulates raw buffers and plain values, tagged so that adjacent inputs can not alias
+
+    def __init__(self):
+        self.hash = hashlib.md5()
+
+    def add_value(self, *values):
+        self.hash.update(repr(values).encode('utf-8'))
+
+    def add_buffer(self, name, a):
+        a = np.ascontiguousarray(a)
+        self.add_value(name, a.dtype.str, a.shape)
+        self.hash.update(a.tobytes())
+
+    def add_foreach(self, name, collection, attrib, size, dtype):
+        # Bulk read of a bpy collection property
+        a = np.empty(len(collection) * size, dtype=dtype)
+        if len(a) > 0:
+            collection.foreach_get(attrib, a)
+        self.add_buffer(name + '.' + attrib, a)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
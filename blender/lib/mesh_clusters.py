@@ -0,0 +1,135 @@
+# Meshlet clustering of index arrays for cluster culling
+# Operates on exported mesh data, no bpy access
+import numpy as np
+import lib.mesh_optimize
+
+max_vertices = 64
+max_triangles = 124
+
+def build_clusters(tris, vertex_count):
+    # Greedy growth over triangles sharing vertices, preferring those adding fewest new vertices
+    # Returns list of triangle lists
+    tri_list = tris.tolist()
+    flat = tris.ravel()
+    valence = np.bincount(flat, minlength=vertex_count)
+    adj_start = (np.cumsum(valence) - valence).tolist()
+    adj = (np.argsort(flat, kind='mergesort') // 3).tolist()
+    valence = valence.tolist()
+    used = [False] * len(tri_list)
+    clusters = []
+    seed = 0
+    while True:
+        while seed < len(tri_list) and used[seed]:
+            seed += 1
+        if seed == len(tri_list):
+            break
+        cluster = []
+        verts = set()
+        candidates = set([seed])
+        while len(candidates) > 0 and len(cluster) < max_triangles:
+            best = -1
+            best_new = 4
+            for t in candidates:
+                new = 0
+                for v in tri_list[t]:
+                    if v not in verts:
+                        new += 1
+                if new < best_new or (new == best_new and t < best):
+                    best = t
+                    best_new = new
+            if len(verts) + best_new > max_vertices:
+                break
+            candidates.discard(best)
+            used[best] = True
+            cluster.append(best)
+            for v in tri_list[best]:
+                if v in verts:
+                    continue
+                verts.add(v)
+                for k in range(adj_start[v], adj_start[v] + valence[v]):
+                    if not used[adj[k]]:
+                        candidates.add(adj[k])
+        clusters.append(cluster)
+    return clusters
+
+def cluster_bounds(pos, tris):
+    # Bounding sphere centered on the box, normal cone axis and cutoff
+    # A cluster is backfacing when dot(center - camera, axis) >= cutoff * |center - camera| + radius
+    p = pos[tris.ravel()]
+    lo = p.min(axis=0)
+    hi = p.max(axis=0)
+    center = (lo + hi) * 0.5
+    radius = np.sqrt(((p - center) ** 2).sum(axis=1)).max()
+
+    v0, v1, v2 = pos[tris[:, 0]], pos[tris[:, 1]], pos[tris[:, 2]]
+    n = np.cross(v1 - v0, v2 - v0)
+    length = np.sqrt((n * n).sum(axis=1))
+    n = n[length > 0] / length[length > 0][:, None]
+    axis = n.sum(axis=0)
+    axis_length = np.sqrt((axis * axis).sum())
+    if len(n) == 0 or axis_length == 0:
+        return center, radius, np.zeros(3), 1.0
+    axis /= axis_length
+    min_dot = (n * axis).sum(axis=1).min()
+    # Spread over 90 degrees can not be culled
+    cutoff = np.sqrt(max(1.0 - min_dot * min_dot, 0.0)) if min_dot > 0.0 else 1.0
+    return center, radius, axis, cutoff
+
+def optimize_cluster(tris, cluster):
+    # Vertex cache order within one cluster, the input order of its triangles or Tipsify on cluster local vertex numbers
+    # Input order keeps an order optimized for the whole mesh, which is often better on small clusters
+    kept = sorted(cluster)
+    verts, local = np.unique(tris[cluster], return_inverse=True)
+    out, fans = lib.mesh_optimize.tipsify(local.ravel().tolist(), len(verts))
+    fanned = [cluster[t] for t in out]
+    if lib.mesh_optimize.cache_misses(tris[fanned].ravel().tolist()) < lib.mesh_optimize.cache_misses(tris[kept].ravel().tolist()):
+        return fanned
+    return kept
+
+def positions(vertex_arrays):
+    for va in vertex_arrays:
+        if va['attrib'] == 'position':
+            return np.array(va['values'], dtype=np.float64).reshape(-1, va['size'])
+    return None
+
+def cluster_mesh(om, optimize_cache=False):
+    # Reorders every index array into contiguous clusters and stores their culling data in ia['clusters']
+    # Levels of detail are clustered the same way, using their own vertex data when compacted
+    # optimize_cache - reorder triangles inside each cluster for vertex cache reuse, cluster order replaces a previous whole mesh order
+    # Returns number of clusters of the base level
+    pos = positions(om['vertex_arrays'])
+    if pos is None:
+        return 0
+    total = cluster_index_arrays(om['index_arrays'], pos, optimize_cache)
+    if 'lods' in om:
+        for lod in om['lods']:
+            lod_pos = positions(lod['vertex_arrays']) if 'vertex_arrays' in lod else pos
+            cluster_index_arrays(lod['index_arrays'], lod_pos, optimize_cache)
+    return total
+
+def cluster_index_arrays(index_arrays, pos, optimize_cache):
+    total = 0
+    for ia in index_arrays:
+        if len(ia['values']) == 0:
+            continue
+        tris = np.array(ia['values'], dtype=np.int64).reshape(-1, 3)
+        clusters = build_clusters(tris, len(pos))
+        if optimize_cache:
+            clusters = [optimize_cluster(tris, cluster) for cluster in clusters]
+        oc = {}
+        oc['triangle_offsets'] = []
+        oc['triangle_counts'] = []
+        oc['bounds'] = []
+        oc['cones'] = []
+        order = []
+        for cluster in clusters:
+            oc['triangle_offsets'].append(len(order))
+            oc['triangle_counts'].append(len(cluster))
+            order += cluster
+            center, radius, axis, cutoff = cluster_bounds(pos, tris[cluster])
+            oc['bounds'] += [float(center[0]), float(center[1]), float(center[2]), float(radius)]
+            oc['cones'] += [float(axis[0]), float(axis[1]), float(axis[2]), float(cutoff)]
+        ia['values'] = tris[order].ravel().tolist()
+        ia['clusters'] = oc
+        total += len(clusters)
+    return total
@@ -0,0 +1,123 @@
+# Encoding stage of mesh export
+# Works on buffers gathered from bpy on the main thread, so meshes can be encoded in worker processes
+import concurrent.futures
+import multiprocessing
+import os
+import lib.arm_writer
+import lib.mesh_batch
+import lib.mesh_clusters
+import lib.mesh_optimize
+import lib.mesh_quantize
+import lib.mesh_simplify
+import lib.mesh_split
+import lib.skin_partition
+import lib.vertex_animation
+
+def create_pool(processes, executable):
+    # Blender is not a Python interpreter, workers are spawned with its bundled Python binary
+    if processes == 0:
+        processes = os.cpu_count() or 1
+    try:
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(executable)
+        return concurrent.futures.ProcessPoolExecutor(processes, mp_context=context)
+    except TypeError: # No mp_context before Python 3.7
+        multiprocessing.set_executable(executable)
+        multiprocessing.set_start_method('spawn', force=True)
+        return concurrent.futures.ProcessPoolExecutor(processes)
+
+def finish_mesh(om, o, options, log):
+    # Post-processing stages of mesh data, returns mesh datas of all parts
+    name = options['name']
+
+    # Save offset data for instanced rendering
+    if options['instance_offsets'] != None:
+        om['instance_offsets'] = options['instance_offsets']
+
+    # Export usage
+    om['static_usage'] = options['static_usage']
+
+    # Reorder triangles and vertices for post-transform cache reuse
+    if options['optimize_cache']:
+        before, after = lib.mesh_optimize.optimize_mesh(om)
+        log.append('Optimized vertex cache of ' + name + ', ACMR ' + '{0:.3f}'.format(before) + ' -> ' + '{0:.3f}'.format(after))
+
+    # Draw skinned meshes in groups of triangles that fit into the bone uniforms
+    if options['skin_max_bones'] > 0 and 'skin' in om:
+        count = lib.skin_partition.partition_skin(om, options['skin_max_bones'])
+        if count > 1:
+            log.append('Partitioned skin of ' + name + ' into ' + str(count) + ' bone palettes of at most ' + str(options['skin_max_bones']) + ' bones')
+
+    # Split into parts addressable by 16-bit indices
+    if options['split_mesh']:
+        parts = lib.mesh_split.split_mesh(om)
+        if len(parts) > 1:
+            log.append('Split mesh ' + name + ' into ' + str(len(parts)) + ' parts to fit into 16-bit indices')
+    else:
+        parts = [om]
+
+    mesh_datas = []
+    for i, pom in enumerate(parts):
+        # Simplified levels of detail, stored with the mesh data
+        if options['lod_generate']:
+            counts, missed = lib.mesh_simplify.generate_lods(pom, options['lod_levels'], options['lod_ratio'])
+            log.append('Generated ' + str(len(counts)) + ' LODs for mesh ' + name + ', triangles ' + ', '.join(str(c) for c in counts))
+            if missed != None:
+                log.append('Armory Warning: LOD targets missed for mesh ' + name + ': ' + missed)
+
+        # Cluster culling data, bounds would not follow skinned vertices
+        if options['cluster_mesh'] and not 'skin' in pom:
+            count = lib.mesh_clusters.cluster_mesh(pom, options['optimize_cache'])
+            if options['optimize_cache']:
+                # Triangles were reordered again, within each meshlet
+                after = lib.mesh_optimize.acmr([ia['values'] for ia in pom['index_arrays']])
+                log.append('Clustered mesh ' + name + ' into ' + str(count) + ' meshlets, ACMR ' + '{0:.3f}'.format(after))
+            else:
+                log.append('Clustered mesh ' + name + ' into ' + str(count) + ' meshlets')
+
+        # Quantize vertex attributes, after tangents were generated from full precision data
+        if options['quantize_mesh'] != 'None':
+            report = lib.mesh_quantize.quantize_mesh(pom, options['quantize_mesh'])
+            errors = ', '.join(attrib + ' ' + '{0:.6f}'.format(report[attrib]) for attrib in sorted(report))
+            log.append('Quantized mesh ' + name + ', max error: ' + errors + ' (normal in degrees)')
+
+        lib.mesh_split.set_index_types(pom)
+        if i == 0:
+            po = o
+        else:
+            po = {}
+            po['name'] = o['name'] + '_part' + str(i)
+        po['mesh'] = pom
+        mesh_datas.append(po)
+    return mesh_datas
+
+def encode_mesh(job):
+    # Builds mesh data from gathered buffers when given, finishes it and writes it to job['fp']
+    # Mesh datas are returned instead of written when there is no file path
+    log = []
+    om = job['om']
+    if job['buffers'] != None:
+        om = {}
+        om['primitive'] = "triangles"
+        vertex_indices = lib.mesh_batch.encode_buffers(job['buffers'], om)
+        # Skin influences were gathered per source vertex
+        if job['skin'] != None:
+            om['skin'] = lib.mesh_split.remap_skin(job['skin'], vertex_indices)
+        # Vertex animation columns were gathered per source vertex
+        if job['vertex_animation'] != None:
+            lib.vertex_animation.add_vertex_animation(om, job['vertex_animation'], vertex_indices)
+    o = {}
+    o['name'] = job['oid']
+    mesh_datas = finish_mesh(om, o, job['options'], log)
+
+    result = {}
+    result['fp'] = job['fp']
+    result['parts'] = len(mesh_datas)
+    result['log'] = log
+    if job['fp'] != None:
+        mesh_obj = {}
+        mesh_obj['mesh_datas'] = mesh_datas
+        lib.arm_writer.write_arm(job['fp'], mesh_obj, job['options']['minimize'], job['options']['binary_arrays'], job['options']['json_precision'])
+    else:
+        result['mesh_datas'] = mesh_datas
+    return result
@@ -0,0 +1,145 @@
+# Post-transform vertex cache, overdraw and vertex fetch optimization
+# Triangle order follows Tipsify (Sander et al. 2007), operates on exported mesh data, no bpy access
+import numpy as np
+import lib.mesh_split
+
+cache_size = 16
+
+def cache_misses(indices, size=cache_size):
+    # Transformed vertices with a fifo cache
+    cache = []
+    in_cache = set()
+    misses = 0
+    for v in indices:
+        if v in in_cache:
+            continue
+        misses += 1
+        cache.append(v)
+        in_cache.add(v)
+        if len(cache) > size:
+            in_cache.discard(cache.pop(0))
+    return misses
+
+def acmr(index_arrays, size=cache_size):
+    # Average cache miss ratio over index arrays, cache starts empty for each draw
+    misses = 0
+    tri_count = 0
+    for indices in index_arrays:
+        misses += cache_misses(indices, size)
+        tri_count += len(indices) // 3
+    return misses / tri_count if tri_count > 0 else 0.0
+
+def tipsify(indices, vertex_count, size=cache_size):
+    # Reorders triangles by fanning around vertices likely to stay in cache
+    # Returns list of triangle numbers and start of each cluster, clusters end where fanning has to restart
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    flat = tris.ravel()
+    valence = np.bincount(flat, minlength=vertex_count)
+    order = np.argsort(flat, kind='mergesort')
+    adj_start = (np.cumsum(valence) - valence).tolist()
+    adj = (order // 3).tolist()
+    valence = valence.tolist()
+    live = list(valence)
+    tri_list = tris.tolist()
+
+    cache_time = [0] * vertex_count
+    timestamp = size + 1
+    emitted = [False] * len(tri_list)
+    dead_end = []
+    cursor = 0
+    out = []
+    clusters = [0]
+    f = int(flat[0]) if len(flat) > 0 else -1
+    while f >= 0:
+        candidates = []
+        for k in range(adj_start[f], adj_start[f] + valence[f]):
+            t = adj[k]
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            out.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - cache_time[v] > size:
+                    cache_time[v] = timestamp
+                    timestamp += 1
+
+        # Next fanning vertex, best candidate still in cache after its remaining triangles
+        f = -1
+        priority = -1
+        for v in candidates:
+            if live[v] > 0:
+                p = 0
+                if timestamp - cache_time[v] + 2 * live[v] <= size:
+                    p = timestamp - cache_time[v]
+                if p > priority:
+                    priority = p
+                    f = v
+        if f == -1:
+            while len(dead_end) > 0:
+                d = dead_end.pop()
+                if live[d] > 0:
+                    f = d
+                    break
+        if f == -1:
+            # Nothing recent left, cluster ends here
+            while f == -1 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    f = cursor
+                cursor += 1
+            if f != -1:
+                clusters.append(len(out))
+    return out, clusters
+
+def sort_clusters(pos, tris, out, clusters):
+    # Clusters facing away from the mesh center are drawn first to reduce overdraw
+    if len(clusters) < 2:
+        return out
+    ordered = tris[np.asarray(out, dtype=np.int64)]
+    v0, v1, v2 = pos[ordered[:, 0]], pos[ordered[:, 1]], pos[ordered[:, 2]]
+    normals = np.cross(v1 - v0, v2 - v0)
+    centers = (v0 + v1 + v2) / 3.0
+    bounds = clusters + [len(out)]
+    center = centers.mean(axis=0)
+    keys = []
+    for i in range(len(clusters)):
+        n = normals[bounds[i]:bounds[i + 1]].sum(axis=0)
+        c = centers[bounds[i]:bounds[i + 1]].mean(axis=0)
+        keys.append(-float(np.dot(c - center, n)))
+    res = []
+    for i in sorted(range(len(clusters)), key=lambda i: keys[i]):
+        res += out[bounds[i]:bounds[i + 1]]
+    return res
+
+def optimize_mesh(om):
+    # Reorders triangles of every index array, then renumbers vertices in first use order
+    # Returns ACMR of all index arrays before and after
+    pos = None
+    count = lib.mesh_split.vertex_count(om)
+    for va in om['vertex_arrays']:
+        if va['attrib'] == 'position':
+            pos = np.array(va['values'], dtype=np.float64).reshape(-1, va['size'])
+    before = acmr([ia['values'] for ia in om['index_arrays']])
+    for ia in om['index_arrays']:
+        if len(ia['values']) < 6:
+            continue
+        tris = np.array(ia['values'], dtype=np.int64).reshape(-1, 3)
+        out, clusters = tipsify(ia['values'], count)
+        out = sort_clusters(pos, tris, out, clusters)
+        ia['values'] = tris[np.asarray(out, dtype=np.int64)].ravel().tolist()
+
+    # Vertex fetch order, unreferenced vertices are kept at the end
+    flat = np.concatenate([np.array(ia['values'], dtype=np.int64) for ia in om['index_arrays']] + [np.zeros(0, dtype=np.int64)])
+    first = np.full(count, len(flat), dtype=np.int64)
+    np.minimum.at(first, flat, np.arange(len(flat)))
+    used = np.argsort(first, kind='mergesort')
+    remap = np.empty(count, dtype=np.int64)
+    remap[used] = np.arange(count)
+    om['vertex_arrays'] = [lib.mesh_split.remap_vertex_array(va, used) for va in om['vertex_arrays']]
+    for ia in om['index_arrays']:
+        ia['values'] = remap[np.array(ia['values'], dtype=np.int64)].tolist()
+    if 'skin' in om:
+        om['skin'] = lib.mesh_split.remap_skin(om['skin'], used)
+    return before, acmr([ia['values'] for ia in om['index_arrays']])
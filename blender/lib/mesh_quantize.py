@@ -0,0 +1,102 @@
+# Vertex attribute quantization for exported meshes
+# Operates on the vertex arrays of mesh data, no bpy access
+import numpy as np
+
+# Profile: (position bits, normal bits per octahedral component, uv encoding)
+profiles = {
+    'High': (16, 16, 'unorm16'),
+    'Low': (16, 8, 'float16'),
+}
+
+def snorm_max(bits):
+    return float(2**(bits - 1) - 1)
+
+def quantize_positions(pos, bits):
+    # Normalized to mesh bounds, decode as value / max * scale + offset
+    lo = pos.min(axis=0)
+    hi = pos.max(axis=0)
+    offset = (lo + hi) * 0.5
+    scale = (hi - lo) * 0.5
+    scale[scale == 0.0] = 1.0
+    m = snorm_max(bits)
+    q = np.round((pos - offset) / scale * m).astype(np.int64)
+    decoded = q / m * scale + offset
+    return q, offset, scale, np.abs(decoded - pos).max()
+
+def oct_encode(nor):
+    n = nor / np.maximum(np.abs(nor).sum(axis=1), 1e-20)[:, None]
+    xy = n[:, :2].copy()
+    back = n[:, 2] < 0.0
+    sign = np.where(xy[back] >= 0.0, 1.0, -1.0)
+    xy[back] = (1.0 - np.abs(xy[back][:, ::-1])) * sign
+    return xy
+
+def oct_decode(xy):
+    n = np.empty((len(xy), 3))
+    n[:, :2] = xy
+    n[:, 2] = 1.0 - np.abs(xy).sum(axis=1)
+    back = n[:, 2] < 0.0
+    sign = np.where(xy[back] >= 0.0, 1.0, -1.0)
+    n[back, :2] = (1.0 - np.abs(xy[back][:, ::-1])) * sign
+    return n / np.maximum(np.sqrt((n * n).sum(axis=1)), 1e-20)[:, None]
+
+def quantize_normals(nor, bits):
+    # Octahedral encoding, two snorm components per normal
+    m = snorm_max(bits)
+    q = np.round(np.clip(oct_encode(nor), -1.0, 1.0) * m).astype(np.int64)
+    unit = nor / np.maximum(np.sqrt((nor * nor).sum(axis=1)), 1e-20)[:, None]
+    dot = np.clip((oct_decode(q / m) * unit).sum(axis=1), -1.0, 1.0)
+    return q, np.degrees(np.arccos(dot)).max()
+
+def quantize_texcoords(uv, encoding):
+    if encoding == 'float16':
+        # Identity offset and scale, shaders decode both encodings alike
+        h = uv.astype(np.float16)
+        return h.view(np.uint16).astype(np.int64), np.zeros(2), np.ones(2), np.abs(h.astype(np.float64) - uv).max()
+    # unorm16 normalized to uv bounds, decode as value / 65535 * scale + offset
+    offset = uv.min(axis=0)
+    scale = uv.max(axis=0) - offset
+    scale[scale == 0.0] = 1.0
+    q = np.round((uv - offset) / scale * 65535.0).astype(np.int64)
+    decoded = q / 65535.0 * scale + offset
+    return q, offset, scale, np.abs(decoded - uv).max()
+
+def quantize_mesh(om, profile):
+    # Quantizes position, normal and texcoord arrays of mesh data in place
+    # Returns error report of max absolute errors, normal error in degrees
+    report = {}
+    quantize_vertex_arrays(om['vertex_arrays'], profile, report)
+    # Levels of detail with compacted vertex data
+    if 'lods' in om:
+        for lod in om['lods']:
+            if 'vertex_arrays' in lod:
+                quantize_vertex_arrays(lod['vertex_arrays'], profile, report)
+    return report
+
+def quantize_vertex_arrays(vertex_arrays, profile, report):
+    pos_bits, nor_bits, uv_encoding = profiles[profile]
+    for va in vertex_arrays:
+        if len(va['values']) == 0:
+            continue
+        values = np.array(va['values'], dtype=np.float64).reshape(-1, va['size'])
+        if va['attrib'] == 'position':
+            q, offset, scale, err = quantize_positions(values, pos_bits)
+            va['type'] = 'int16'
+            va['offset'] = offset.tolist()
+            va['scale'] = scale.tolist()
+        elif va['attrib'] == 'normal':
+            q, err = quantize_normals(values, nor_bits)
+            va['type'] = 'int16' if nor_bits == 16 else 'int8'
+            va['size'] = 2
+            va['encoding'] = 'octahedral'
+        elif va['attrib'] == 'texcoord':
+            q, offset, scale, err = quantize_texcoords(values, uv_encoding)
+            va['type'] = 'uint16' if uv_encoding == 'unorm16' else 'float16'
+            va['offset'] = offset.tolist()
+            va['scale'] = scale.tolist()
+        else:
+            # Other attributes stay float, e.g. texcoord1 which no mesh shader decodes
+            continue
+        va['normalized'] = va['type'] != 'float16'
+        va['values'] = q.ravel().tolist()
+        report[va['attrib']] = max(report.get(va['attrib'], 0.0), float(err))
@@ -0,0 +1,274 @@
+# Quadric error edge collapse simplification for mesh LOD chains
+# Vertices collapse onto their neighbours, so every level keeps indexing the original vertex data
+# Vertices sharing a position, e.g. split on uv or normal seams, collapse together along the seam
+# Operates on exported mesh data, no bpy access
+import heapq
+import numpy as np
+import lib.mesh_batch
+import lib.mesh_split
+
+# Planes through open edges, relative to the unit weight of face planes
+border_weight = 10.0
+# Reject collapses turning a triangle normal by more than ~75 degrees
+flip_threshold = 0.25
+# Projected error considered invisible, fraction of screen height
+screen_error = 0.002
+# Store compacted vertex data when a level uses less than this part of the vertices
+compact_ratio = 0.5
+
+def plane(n, p):
+    # Quadric coefficients a2, ab, ac, ad, b2, bc, bd, c2, cd, d2 of plane with unit normal n through p
+    a, b, c = n[..., 0], n[..., 1], n[..., 2]
+    d = -(a * p[..., 0] + b * p[..., 1] + c * p[..., 2])
+    return np.stack((a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d), axis=-1)
+
+def normalize(v):
+    length = np.sqrt((v * v).sum(axis=1))
+    res = np.zeros(v.shape)
+    np.divide(v, length[:, None], out=res, where=length[:, None] > 0)
+    return res
+
+def vertex_quadrics(pos, tris):
+    # Sum of face planes per vertex and the same with open edges adding perpendicular planes,
+    # which keeps borders and seams in place
+    # Returns (cost quadrics, geometric quadrics, surface areas), geometric quadrics are area weighted,
+    # divided by the area they measure mean squared distance to the surface
+    v0, v1, v2 = pos[tris[:, 0]], pos[tris[:, 1]], pos[tris[:, 2]]
+    cross = np.cross(v1 - v0, v2 - v0)
+    area = np.sqrt((cross * cross).sum(axis=1)) * 0.5
+    nor = normalize(cross)
+    face = plane(nor, v0)
+    q = np.zeros((len(pos), 10))
+    geometric = np.zeros((len(pos), 10))
+    areas = np.zeros(len(pos))
+    for k in range(3):
+        np.add.at(q, tris[:, k], face)
+        np.add.at(geometric, tris[:, k], face * area[:, None])
+        np.add.at(areas, tris[:, k], area)
+
+    edges = np.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]))
+    edge_face = np.tile(np.arange(len(tris)), 3)
+    first, inverse = lib.mesh_batch.unique_rows(np.sort(edges, axis=1))
+    border = np.bincount(inverse, minlength=len(first))[inverse] == 1
+    a = edges[border, 0]
+    b = edges[border, 1]
+    d = pos[b] - pos[a]
+    m = normalize(np.cross(d, nor[edge_face[border]]))
+    side = plane(m, pos[a]) * border_weight
+    np.add.at(q, a, side)
+    np.add.at(q, b, side)
+    return q, geometric, areas
+
+def quadric_error(q, p):
+    x, y, z = p
+    return (x * x * q[0] + 2 * x * y * q[1] + 2 * x * z * q[2] + 2 * x * q[3] +
+            y * y * q[4] + 2 * y * z * q[5] + 2 * y * q[6] +
+            z * z * q[7] + 2 * z * q[8] + q[9])
+
+def face_normal(a, b, c):
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    return (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+
+class Simplifier:
+    # Incremental simplification, each reduce call continues from the previous level
+
+    def __init__(self, pos, tris):
+        self.pos = pos.tolist()
+        self.tris = tris.tolist()
+        self.alive = [True] * len(self.tris)
+        self.tri_count = len(self.tris)
+        self.vtris = [set() for i in range(len(pos))]
+        for t, tri in enumerate(self.tris):
+            for v in tri:
+                self.vtris[v].add(t)
+        # Quadrics, heap entries and collapses work on welded positions, groups of coincident vertices
+        first, self.group = lib.mesh_batch.unique_rows(pos)
+        self.group = self.group.tolist()
+        self.members = [[] for i in range(len(first))]
+        for v, g in enumerate(self.group):
+            self.members[g].append(v)
+        q, geometric, areas = vertex_quadrics(pos, tris)
+        self.quadrics = np.zeros((len(first), 10))
+        np.add.at(self.quadrics, self.group, q)
+        self.quadrics = self.quadrics.tolist()
+        self.geometric = np.zeros((len(first), 10))
+        np.add.at(self.geometric, self.group, geometric)
+        self.geometric = self.geometric.tolist()
+        self.areas = np.bincount(self.group, weights=areas, minlength=len(first)).tolist()
+        self.stamp = [0] * len(first)
+        # Largest rms distance of a collapsed vertex to the surface it replaced
+        self.error = 0.0
+        self.heap = []
+        for g in range(len(first)):
+            self.push(g)
+
+    def neighbours(self, v):
+        res = set()
+        for t in self.vtris[v]:
+            res.update(self.tris[t])
+        res.discard(v)
+        return res
+
+    def group_neighbours(self, g):
+        res = set()
+        for u in self.members[g]:
+            for v in self.neighbours(u):
+                res.add(self.group[v])
+        res.discard(g)
+        return res
+
+    def push(self, g):
+        self.stamp[g] += 1
+        for h in self.group_neighbours(g):
+            cost = quadric_error(self.quadrics[g], self.pos[self.members[h][0]])
+            heapq.heappush(self.heap, (cost, g, h, self.stamp[g]))
+
+    def collapse_pairs(self, g, h):
+        # Every vertex of g collapses onto the one vertex of h it shares an edge with
+        # Seam vertices must stay on their side, so distinct vertices of g need distinct targets
+        pairs = []
+        targets = set()
+        for u in self.members[g]:
+            if len(self.vtris[u]) == 0:
+                continue
+            adjacent = [v for v in self.members[h] if len(self.vtris[v]) > 0 and v in self.neighbours(u)]
+            if len(adjacent) != 1 or adjacent[0] in targets:
+                return None
+            pairs.append((u, adjacent[0]))
+            targets.add(adjacent[0])
+        return pairs
+
+    def can_collapse(self, u, v):
+        # Link condition, only the triangles on the edge may share both endpoints
+        shared = 0
+        for t in self.vtris[u]:
+            if v in self.tris[t]:
+                shared += 1
+        if len(self.neighbours(u) & self.neighbours(v)) > shared:
+            return False
+        # Moving u onto v must not fold triangles over
+        pv = self.pos[v]
+        for t in self.vtris[u]:
+            tri = self.tris[t]
+            if v in tri:
+                continue
+            # Closed pieces such as a tetrahedron would fold onto existing triangles
+            others = [i for i in tri if i != u]
+            for s in self.vtris[v]:
+                if others[0] in self.tris[s] and others[1] in self.tris[s]:
+                    return False
+            p = [self.pos[i] for i in tri]
+            n0 = face_normal(p[0], p[1], p[2])
+            p[tri.index(u)] = pv
+            n1 = face_normal(p[0], p[1], p[2])
+            dot = n0[0] * n1[0] + n0[1] * n1[1] + n0[2] * n1[2]
+            len0 = n0[0] * n0[0] + n0[1] * n0[1] + n0[2] * n0[2]
+            len1 = n1[0] * n1[0] + n1[1] * n1[1] + n1[2] * n1[2]
+            # Triangles that were degenerate before have no orientation to flip
+            if len0 > 0.0 and (dot <= 0.0 or dot * dot < flip_threshold * flip_threshold * len0 * len1):
+                return False
+        return True
+
+    def collapse(self, u, v):
+        for t in list(self.vtris[u]):
+            tri = self.tris[t]
+            if v in tri:
+                self.alive[t] = False
+                self.tri_count -= 1
+                for i in tri:
+                    self.vtris[i].discard(t)
+            else:
+                tri[tri.index(u)] = v
+                self.vtris[v].add(t)
+        self.vtris[u] = set()
+
+    def collapse_group(self, g, h, pairs):
+        for u, v in pairs:
+            self.collapse(u, v)
+        self.quadrics[h] = [a + b for a, b in zip(self.quadrics[h], self.quadrics[g])]
+        self.geometric[h] = [a + b for a, b in zip(self.geometric[h], self.geometric[g])]
+        self.areas[h] += self.areas[g]
+        self.push(h)
+        for k in self.group_neighbours(h):
+            self.push(k)
+
+    def reduce(self, target_count):
+        # Collapses cheapest edges until target_count triangles remain or nothing can collapse
+        while self.tri_count > target_count and len(self.heap) > 0:
+            cost, g, h, stamp = heapq.heappop(self.heap)
+            if stamp != self.stamp[g]:
+                continue
+            pairs = self.collapse_pairs(g, h)
+            if pairs == None or len(pairs) == 0:
+                continue
+            if not all(self.can_collapse(u, v) for u, v in pairs):
+                continue
+            if self.areas[g] > 0.0:
+                distance = np.sqrt(max(quadric_error(self.geometric[g], self.pos[pairs[0][1]]) / self.areas[g], 0.0))
+                self.error = max(self.error, distance)
+            self.collapse_group(g, h, pairs)
+        return self.tri_count
+
+def generate_lods(om, levels, ratio):
+    # Appends simplified levels to om['lods'], each keeps index arrays of the same material slots
+    # Levels use the base vertex data unless compacted vertex arrays are stored with them
+    # Returns triangle count of every level and a message when levels missed their target
+    # Levels are kept while they have fewer triangles than the previous one, generation stops at the first level without progress
+    pos = None
+    for va in om['vertex_arrays']:
+        if va['attrib'] == 'position':
+            pos = np.array(va['values'], dtype=np.float64).reshape(-1, va['size'])
+    if pos is None or len(om['index_arrays']) == 0:
+        return [], None
+    tris = np.concatenate([np.array(ia['values'], dtype=np.int64) for ia in om['index_arrays']]).reshape(-1, 3)
+    tri_ia = np.concatenate([np.full(len(ia['values']) // 3, i, dtype=np.int64) for i, ia in enumerate(om['index_arrays'])]).tolist()
+    radius = np.sqrt(((pos.max(axis=0) - pos.min(axis=0)) ** 2).sum()) * 0.5
+    simplifier = Simplifier(pos, tris)
+
+    om['lods'] = []
+    counts = []
+    missed = []
+    target = float(len(tris))
+    screen_size = 1.0
+    for level in range(levels):
+        target *= ratio
+        count = simplifier.reduce(int(target))
+        if count > int(target):
+            missed.append('level ' + str(level + 1) + ' stopped at ' + str(count) + ' of ' + str(int(target)) + ' target triangles')
+        previous = counts[-1] if len(counts) > 0 else len(tris)
+        if count == 0 or count >= previous:
+            missed.append('levels from ' + str(level + 1) + ' skipped without progress')
+            break
+        counts.append(count)
+
+        lod = {}
+        lod['index_arrays'] = []
+        alive = [t for t in range(len(simplifier.tris)) if simplifier.alive[t]]
+        for i, ia in enumerate(om['index_arrays']):
+            values = [v for t in alive if tri_ia[t] == i for v in simplifier.tris[t]]
+            if len(values) == 0:
+                continue
+            lia = dict(ia)
+            lia['values'] = values
+            lod['index_arrays'].append(lia)
+
+        flat = np.concatenate([np.array(ia['values'], dtype=np.int64) for ia in lod['index_arrays']])
+        used = np.unique(flat)
+        if len(used) < len(pos) * compact_ratio:
+            remap = np.zeros(len(pos), dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            lod['vertex_arrays'] = [lib.mesh_split.remap_vertex_array(va, used) for va in om['vertex_arrays']]
+            for lia in lod['index_arrays']:
+                lia['values'] = remap[np.array(lia['values'], dtype=np.int64)].tolist()
+            if 'skin' in om:
+                lod['skin'] = lib.mesh_split.remap_skin(om['skin'], used)
+
+        # Switch to this level when the object covers less of the screen height
+        error = simplifier.error
+        if error > 0.0 and radius > 0.0:
+            screen_size = min(screen_size, screen_error * radius / error)
+        lod['screen_size'] = screen_size
+        lod['error'] = float(error)
+        om['lods'].append(lod)
+    return counts, ', '.join(missed) if len(missed) > 0 else None
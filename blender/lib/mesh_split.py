@@ -0,0 +1,109 @@
+# Index width selection and splitting of meshes exceeding 16-bit indices
+# Operates on exported mesh data, no bpy access
+import numpy as np
+
+max_vertices16 = 2**16
+
+def index_type(vertex_count):
+    # Smallest unsigned type able to address all vertices
+    if vertex_count <= 2**8:
+        return 'uint8'
+    if vertex_count <= 2**16:
+        return 'uint16'
+    return 'uint32'
+
+def vertex_count(om):
+    for va in om['vertex_arrays']:
+        if va['attrib'] == 'position':
+            return len(va['values']) // va['size']
+    return 0
+
+def set_index_types(om):
+    t = index_type(vertex_count(om))
+    for ia in om['index_arrays']:
+        ia['type'] = t
+    # Levels of detail index their own vertex data when compacted
+    if 'lods' in om:
+        for lod in om['lods']:
+            lod_type = index_type(vertex_count(lod)) if 'vertex_arrays' in lod else t
+            for ia in lod['index_arrays']:
+                ia['type'] = lod_type
+
+def partition(pos, tris, limit):
+    # Recursive median split of triangles along the longest axis of their centroids,
+    # until every part references at most limit vertices
+    # Returns triangle numbers of each part, in spatial order
+    centroids = pos[tris].mean(axis=1)
+    parts = []
+    stack = [np.arange(len(tris))]
+    while len(stack) > 0:
+        sel = stack.pop()
+        if len(sel) <= 1 or len(np.unique(tris[sel])) <= limit:
+            parts.append(np.sort(sel))
+            continue
+        c = centroids[sel]
+        axis = np.argmax(c.max(axis=0) - c.min(axis=0))
+        order = np.argsort(c[:, axis], kind='mergesort')
+        half = len(sel) // 2
+        stack.append(sel[order[half:]])
+        stack.append(sel[order[:half]])
+    return parts
+
+def remap_vertex_array(va, used):
+    res = dict(va)
+    values = np.array(va['values']).reshape(-1, va['size'])
+    res['values'] = values[used].ravel().tolist()
+    return res
+
+def remap_skin(oskin, used):
+    # Bone influences are stored per vertex with fixed stride or variable count
+    res = dict(oskin)
+    if 'bone_stride' in oskin:
+        stride = oskin['bone_stride']
+        res['bone_index_array'] = np.array(oskin['bone_index_array']).reshape(-1, stride)[used].ravel().tolist()
+        res['bone_weight_array'] = np.array(oskin['bone_weight_array']).reshape(-1, stride)[used].ravel().tolist()
+        return res
+    counts = np.array(oskin['bone_count_array'], dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    c = counts[used]
+    local = np.cumsum(c) - c
+    flat = np.repeat(starts[used] - local, c) + np.arange(c.sum())
+    res['bone_count_array'] = c.tolist()
+    res['bone_index_array'] = np.array(oskin['bone_index_array'])[flat].tolist()
+    res['bone_weight_array'] = np.array(oskin['bone_weight_array'])[flat].tolist()
+    return res
+
+def split_mesh(om, limit=max_vertices16):
+    # Splits mesh data into spatially coherent parts of at most limit vertices
+    # Parts keep index arrays of all material slots they use, empty ones are dropped
+    # Returns list of mesh datas, [om] if the mesh already fits
+    if vertex_count(om) <= limit or len(om['index_arrays']) == 0:
+        return [om]
+    pos = None
+    for va in om['vertex_arrays']:
+        if va['attrib'] == 'position':
+            pos = np.array(va['values'], dtype=np.float64).reshape(-1, va['size'])
+    tris = np.concatenate([np.array(ia['values'], dtype=np.int64) for ia in om['index_arrays']]).reshape(-1, 3)
+    tri_ia = np.concatenate([np.full(len(ia['values']) // 3, i, dtype=np.int64) for i, ia in enumerate(om['index_arrays'])])
+
+    parts = []
+    for sel in partition(pos, tris, limit):
+        used, local = np.unique(tris[sel], return_inverse=True)
+        local = local.reshape(-1, 3)
+        part = {}
+        for k, v in om.items():
+            if k != 'vertex_arrays' and k != 'index_arrays' and k != 'skin':
+                part[k] = v
+        part['vertex_arrays'] = [remap_vertex_array(va, used) for va in om['vertex_arrays']]
+        part['index_arrays'] = []
+        for i, ia in enumerate(om['index_arrays']):
+            mask = tri_ia[sel] == i
+            if not mask.any():
+                continue
+            pia = dict(ia)
+            pia['values'] = local[mask].ravel().tolist()
+            part['index_arrays'].append(pia)
+        if 'skin' in om:
+            part['skin'] = remap_skin(om['skin'], used)
+        parts.append(part)
+    return parts
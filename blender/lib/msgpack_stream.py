@@ -0,0 +1,287 @@
+# Streaming msgpack encoder
+# Writes map and array headers with known lengths up front and numeric arrays in chunks through a write buffer,
+# output is identical to lib.umsgpack.dumps, with typed arrays identical to lib.typed_arrays.pack_arrays
+import array
+import struct
+import sys
+import time
+import numpy as np
+import lib.umsgpack
+import lib.typed_arrays
+
+chunk_size = 4096
+# Float lists at least this long are packed with numpy instead of per element
+min_numpy_length = 64
+# Buffered output is handed to the file once it grows past this size
+flush_size = 2**20
+
+def array_header(n):
+    if n <= 15:
+        return struct.pack("B", 0x90 | n)
+    elif n <= 2**16-1:
+        return b"\xdc" + struct.pack(">H", n)
+    elif n <= 2**32-1:
+        return b"\xdd" + struct.pack(">I", n)
+    raise lib.umsgpack.UnsupportedTypeException("huge array")
+
+def map_header(n):
+    if n <= 15:
+        return struct.pack("B", 0x80 | n)
+    elif n <= 2**16-1:
+        return b"\xde" + struct.pack(">H", n)
+    elif n <= 2**32-1:
+        return b"\xdf" + struct.pack(">I", n)
+    raise lib.umsgpack.UnsupportedTypeException("huge array")
+
+def ext_header(ext_type, size):
+    fixext = {1: b"\xd4", 2: b"\xd5", 4: b"\xd6", 8: b"\xd7", 16: b"\xd8"}
+    if size in fixext:
+        return fixext[size] + struct.pack("B", ext_type & 0xff)
+    elif size <= 2**8-1:
+        return b"\xc7" + struct.pack("BB", size, ext_type & 0xff)
+    elif size <= 2**16-1:
+        return b"\xc8" + struct.pack(">HB", size, ext_type & 0xff)
+    elif size <= 2**32-1:
+        return b"\xc9" + struct.pack(">IB", size, ext_type & 0xff)
+    raise lib.umsgpack.UnsupportedTypeException("huge ext data")
+
+# Packed forms of small unsigned integers, covers index arrays
+small_ints = None
+
+def get_small_ints():
+    global small_ints
+    if small_ints == None:
+        small_ints = [lib.umsgpack.packb(i) for i in range(2**16)]
+    return small_ints
+
+def pack_string(s):
+    # Same encoding as lib.umsgpack without compatibility mode
+    b = s.encode('utf-8')
+    n = len(b)
+    if n <= 31:
+        return struct.pack("B", 0xa0 | n) + b
+    elif n <= 2**8-1:
+        return b"\xd9" + struct.pack("B", n) + b
+    elif n <= 2**16-1:
+        return b"\xda" + struct.pack(">H", n) + b
+    return lib.umsgpack.packb(s)
+
+def is_float_list(values):
+    for v in values:
+        if type(v) is not float:
+            return False
+    return True
+
+def is_int_list(values):
+    for v in values:
+        if type(v) is not int:
+            return False
+    return True
+
+def ext_dtype(values, dtype):
+    # Element type of a typed blob, None when values stay a plain array
+    if dtype != None:
+        return dtype
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'f':
+            return 'float32'
+        return lib.typed_arrays.pick_dtype([int(values.min()), int(values.max())])
+    return lib.typed_arrays.pick_dtype(values)
+
+class StreamWriter:
+    # Encodes objects into a write buffer flushed to a binary file object, no full copy of the output is kept
+    # Without a file object the whole output stays in the buffer, see packb
+
+    def __init__(self, f, binary_arrays=False):
+        self.f = f
+        self.binary_arrays = binary_arrays
+        self.buf = bytearray()
+        # Packed map keys, the same few names repeat throughout a scene
+        self.packed_keys = {}
+        if lib.umsgpack._float_size == 64:
+            self.float_code = 0xcb
+            self.float_struct = struct.Struct('>Bd')
+        else:
+            self.float_code = 0xca
+            self.float_struct = struct.Struct('>Bf')
+
+    def write(self, obj):
+        self.write_obj(obj, self.binary_arrays)
+        self.flush()
+
+    def emit(self, b):
+        self.buf += b
+        if self.f != None and len(self.buf) >= flush_size:
+            self.flush()
+
+    def flush(self):
+        if self.f != None and len(self.buf) > 0:
+            self.f.write(self.buf)
+            self.buf = bytearray()
+
+    def write_obj(self, obj, binary):
+        t = type(obj)
+        if t is float:
+            self.emit(self.float_struct.pack(self.float_code, obj))
+        elif t is int and 0 <= obj < 2**16:
+            self.emit(get_small_ints()[obj])
+        elif t is str and not lib.umsgpack.compatibility:
+            self.emit(pack_string(obj))
+        elif obj is True:
+            self.emit(b"\xc3")
+        elif obj is False:
+            self.emit(b"\xc2")
+        elif obj is None:
+            self.emit(b"\xc0")
+        elif isinstance(obj, dict):
+            self.write_map(obj, binary)
+        elif isinstance(obj, list) or isinstance(obj, tuple):
+            self.write_array(obj, binary)
+        elif isinstance(obj, np.ndarray):
+            self.write_array(obj.ravel(), binary)
+        else:
+            self.emit(lib.umsgpack.packb(obj))
+
+    def write_key(self, k):
+        packed = self.packed_keys.get(k)
+        if packed == None:
+            packed = lib.umsgpack.packb(k)
+            if type(k) is str:
+                self.packed_keys[k] = packed
+        self.emit(packed)
+
+    def write_map(self, obj, binary):
+        self.emit(map_header(len(obj)))
+        dtype = None
+        if binary:
+            dtype = obj.get('type')
+            if not isinstance(dtype, str) or dtype not in lib.typed_arrays.ext_types:
+                dtype = None
+        for k, v in obj.items():
+            self.write_key(k)
+            if binary and k in lib.typed_arrays.array_keys and (isinstance(v, list) or isinstance(v, np.ndarray)):
+                self.write_values(v, dtype)
+            else:
+                self.write_obj(v, binary)
+
+    def write_array(self, values, binary):
+        self.emit(array_header(len(values)))
+        if isinstance(values, np.ndarray):
+            self.write_numbers(values)
+        elif len(values) == 0:
+            return
+        elif type(values[0]) is float and is_float_list(values):
+            if len(values) >= min_numpy_length:
+                self.write_numbers(values)
+            else:
+                pack = self.float_struct.pack
+                code = self.float_code
+                self.emit(b''.join([pack(code, v) for v in values]))
+        elif type(values[0]) is int and is_int_list(values):
+            self.write_numbers(values)
+        else:
+            for v in values:
+                self.write_obj(v, binary)
+
+    def write_numbers(self, values):
+        # Homogeneous float or integer elements, packed a chunk at a time
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            if isinstance(chunk, np.ndarray):
+                if chunk.dtype.kind != 'f':
+                    chunk = chunk.tolist()
+            elif type(chunk[0]) is float:
+                chunk = np.array(chunk, dtype=np.float64)
+            if isinstance(chunk, np.ndarray):
+                if lib.umsgpack._float_size == 64:
+                    packed = np.empty(len(chunk), dtype=[('code', 'u1'), ('value', '>f8')])
+                    packed['code'] = 0xcb
+                else:
+                    packed = np.empty(len(chunk), dtype=[('code', 'u1'), ('value', '>f4')])
+                    packed['code'] = 0xca
+                packed['value'] = chunk
+                self.emit(packed.tobytes())
+            else:
+                table = get_small_ints()
+                self.emit(b''.join([table[v] if type(v) is int and 0 <= v < 2**16 else lib.umsgpack.packb(v) for v in chunk]))
+
+    def write_values(self, values, dtype):
+        # Same decisions as lib.typed_arrays.pack_values
+        if isinstance(values, np.ndarray):
+            if values.ndim > 1:
+                dtypes = [ext_dtype(row, dtype) for row in values]
+                plain = None in dtypes
+                self.emit(array_header(len(values)))
+                for row, row_dtype in zip(values, dtypes):
+                    if plain:
+                        self.write_array(row, False)
+                    else:
+                        self.write_ext(row, row_dtype)
+            elif (len(values) >= lib.typed_arrays.min_length or dtype != None) and ext_dtype(values, dtype) != None:
+                self.write_ext(values, ext_dtype(values, dtype))
+            else:
+                self.write_array(values, False)
+            return
+        if len(values) > 0 and isinstance(values[0], list):
+            if all(isinstance(v, list) and lib.typed_arrays.is_numeric(v) for v in values):
+                dtypes = [ext_dtype(row, dtype) for row in values]
+                if None in dtypes:
+                    self.write_array(values, False)
+                    return
+                self.emit(array_header(len(values)))
+                for row, row_dtype in zip(values, dtypes):
+                    self.write_ext(row, row_dtype)
+            else:
+                self.write_array(values, True)
+        elif (len(values) >= lib.typed_arrays.min_length or dtype != None) and lib.typed_arrays.is_numeric(values) and ext_dtype(values, dtype) != None:
+            self.write_ext(values, ext_dtype(values, dtype))
+        else:
+            self.write_array(values, False)
+
+    def write_ext(self, values, dtype):
+        # Typed blob written in chunks, matches lib.typed_arrays.encode
+        ext_type, typecode = lib.typed_arrays.ext_types[dtype]
+        itemsize = array.array(typecode).itemsize
+        self.emit(ext_header(ext_type, len(values) * itemsize))
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            if isinstance(chunk, np.ndarray):
+                chunk = chunk.tolist()
+            a = array.array(typecode, chunk)
+            if sys.byteorder == 'big':
+                a.byteswap()
+            self.emit(a.tobytes())
+
+def dump(obj, f, binary_arrays=False):
+    StreamWriter(f, binary_arrays).write(obj)
+
+def packb(obj, binary_arrays=False):
+    # In-memory counterpart of dump, matches lib.umsgpack.packb
+    w = StreamWriter(None, binary_arrays)
+    w.write(obj)
+    return bytes(w.buf)
+
+def benchmark(paths, repeat=3):
+    # Compares packb against lib.umsgpack.dumps on exported .arm files
+    for path in paths:
+        with open(path, 'rb') as f:
+            obj = lib.umsgpack.unpack(f)
+        times = []
+        for pack in (lib.umsgpack.dumps, packb):
+            best = None
+            for i in range(repeat):
+                t = time.time()
+                data = pack(obj)
+                t = time.time() - t
+                if best == None or t < best:
+                    best = t
+            times.append((best, data))
+        if times[0][1] != times[1][1]:
+            print('{0}: output differs'.format(path))
+        else:
+            print('{0}: {1} bytes, umsgpack {2:.1f} ms, stream {3:.1f} ms, {4:.1f}x'.format(
+                path, len(times[0][1]), times[0][0] * 1000, times[1][0] * 1000, times[0][0] / max(times[1][0], 1e-9)))
+
+if __name__ == '__main__':
+    # Run from the blender directory: python -m lib.msgpack_stream build/compiled/Assets/*.arm
+    benchmark(sys.argv[1:])
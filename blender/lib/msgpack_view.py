@@ -0,0 +1,229 @@
+# Lazy msgpack decoder for reading .arm files back in build tools
+# Works on a memoryview of the file, maps and arrays decode entries only when accessed,
+# float arrays and typed blobs are returned as numpy views without copying the data
+import collections.abc
+import mmap
+import struct
+import numpy as np
+import lib.umsgpack
+import lib.typed_arrays
+
+# Size of scalars with a fixed encoded length, by type code
+fixed_sizes = {0xc0: 1, 0xc2: 1, 0xc3: 1, 0xca: 5, 0xcb: 9,
+               0xcc: 2, 0xcd: 3, 0xce: 5, 0xcf: 9, 0xd0: 2, 0xd1: 3, 0xd2: 5, 0xd3: 9,
+               0xd4: 3, 0xd5: 4, 0xd6: 6, 0xd7: 10, 0xd8: 18}
+int_formats = {0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q', 0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'}
+fixext_sizes = {0xd4: 1, 0xd5: 2, 0xd6: 4, 0xd7: 8, 0xd8: 16}
+
+def read_length(mv, pos, size):
+    if size == 1:
+        return mv[pos]
+    elif size == 2:
+        return struct.unpack_from('>H', mv, pos)[0]
+    return struct.unpack_from('>I', mv, pos)[0]
+
+def header(mv, pos):
+    # Returns (kind, length, data position), length counts elements for containers and bytes otherwise
+    c = mv[pos]
+    if c <= 0x7f or c >= 0xe0:
+        return 'int', 0, pos
+    elif c <= 0x8f:
+        return 'map', c & 0x0f, pos + 1
+    elif c <= 0x9f:
+        return 'array', c & 0x0f, pos + 1
+    elif c <= 0xbf:
+        return 'str', c & 0x1f, pos + 1
+    elif c == 0xdc or c == 0xdd:
+        size = 2 if c == 0xdc else 4
+        return 'array', read_length(mv, pos + 1, size), pos + 1 + size
+    elif c == 0xde or c == 0xdf:
+        size = 2 if c == 0xde else 4
+        return 'map', read_length(mv, pos + 1, size), pos + 1 + size
+    elif c == 0xd9 or c == 0xda or c == 0xdb:
+        size = {0xd9: 1, 0xda: 2, 0xdb: 4}[c]
+        return 'str', read_length(mv, pos + 1, size), pos + 1 + size
+    elif c == 0xc4 or c == 0xc5 or c == 0xc6:
+        size = {0xc4: 1, 0xc5: 2, 0xc6: 4}[c]
+        return 'bin', read_length(mv, pos + 1, size), pos + 1 + size
+    elif c == 0xc7 or c == 0xc8 or c == 0xc9:
+        size = {0xc7: 1, 0xc8: 2, 0xc9: 4}[c]
+        # Data follows the ext type byte
+        return 'ext', read_length(mv, pos + 1, size), pos + 2 + size
+    elif c in fixext_sizes:
+        return 'ext', fixext_sizes[c], pos + 2
+    elif c in fixed_sizes:
+        return 'scalar', 0, pos
+    raise lib.umsgpack.ReservedCodeException("reserved code: 0x%02x" % c)
+
+def float_run(mv, pos, n):
+    # Numpy dtype and stride if all n array elements at pos are floats of one width
+    for code, dtype, stride in ((0xcb, '>f8', 9), (0xca, '>f4', 5)):
+        if mv[pos] == code and pos + n * stride <= len(mv):
+            codes = np.frombuffer(mv, dtype=np.uint8, count=n * stride, offset=pos)[::stride]
+            if (codes == code).all():
+                return dtype, stride
+    return None
+
+def skip(mv, pos):
+    # Position after the object at pos, nothing is decoded
+    remaining = 1
+    while remaining > 0:
+        remaining -= 1
+        c = mv[pos]
+        if c <= 0x7f or c >= 0xe0:
+            pos += 1
+            continue
+        if c in fixed_sizes:
+            pos += fixed_sizes[c]
+            continue
+        kind, n, data = header(mv, pos)
+        if kind == 'map':
+            remaining += 2 * n
+            pos = data
+        elif kind == 'array':
+            run = float_run(mv, data, n) if n > 0 else None
+            if run != None:
+                pos = data + n * run[1]
+            else:
+                remaining += n
+                pos = data
+        else:
+            pos = data + n
+    return pos
+
+def decode(mv, pos):
+    # Scalars are decoded, containers are wrapped for lazy access
+    c = mv[pos]
+    if c <= 0x7f:
+        return c
+    elif c >= 0xe0:
+        return c - 0x100
+    elif c == 0xc0:
+        return None
+    elif c == 0xc2:
+        return False
+    elif c == 0xc3:
+        return True
+    elif c == 0xcb:
+        return struct.unpack_from('>d', mv, pos + 1)[0]
+    elif c == 0xca:
+        return struct.unpack_from('>f', mv, pos + 1)[0]
+    elif c in int_formats:
+        return struct.unpack_from(int_formats[c], mv, pos + 1)[0]
+    kind, n, data = header(mv, pos)
+    if kind == 'map':
+        return LazyMap(mv, n, data)
+    elif kind == 'array':
+        run = float_run(mv, data, n) if n > 0 else None
+        if run != None:
+            # Strided view skipping the type code of every element
+            return np.ndarray(shape=(n,), dtype=run[0], buffer=mv, offset=data + 1, strides=(run[1],))
+        return LazyArray(mv, n, data)
+    elif kind == 'str':
+        return bytes(mv[data:data + n]).decode('utf-8')
+    elif kind == 'bin':
+        return mv[data:data + n]
+    ext_type = mv[data - 1]
+    if ext_type in lib.typed_arrays.ext_dtypes:
+        typecode = lib.typed_arrays.ext_types[lib.typed_arrays.ext_dtypes[ext_type]][1]
+        dtype = np.dtype('<' + typecode)
+        return np.frombuffer(mv, dtype=dtype, count=n // dtype.itemsize, offset=data)
+    return lib.umsgpack.Ext(ext_type, bytes(mv[data:data + n]))
+
+class LazyMap(collections.abc.Mapping):
+    # Entries are located on first access by skipping over the preceding values
+
+    def __init__(self, mv, count, pos):
+        self.mv = mv
+        self.count = count
+        self.offsets = collections.OrderedDict()
+        self.values = {}
+        self.next_pos = pos
+
+    def scan(self, key=None):
+        # Indexes entries until key is found, or all of them without a key
+        while len(self.offsets) < self.count:
+            k = decode(self.mv, self.next_pos)
+            value_pos = skip(self.mv, self.next_pos)
+            self.offsets[k] = value_pos
+            self.next_pos = skip(self.mv, value_pos)
+            if key != None and k == key:
+                return
+
+    def __getitem__(self, key):
+        if key in self.values:
+            return self.values[key]
+        if key not in self.offsets:
+            self.scan(key)
+            if key not in self.offsets:
+                raise KeyError(key)
+        v = decode(self.mv, self.offsets[key])
+        self.values[key] = v
+        return v
+
+    def __contains__(self, key):
+        if key not in self.offsets:
+            self.scan(key)
+        return key in self.offsets
+
+    def __iter__(self):
+        self.scan()
+        return iter(self.offsets)
+
+    def __len__(self):
+        return self.count
+
+class LazyArray(collections.abc.Sequence):
+    # Element offsets are found on first access, like LazyMap entries
+
+    def __init__(self, mv, count, pos):
+        self.mv = mv
+        self.count = count
+        self.offsets = []
+        self.values = {}
+        self.next_pos = pos
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError(i)
+        if i in self.values:
+            return self.values[i]
+        while len(self.offsets) <= i:
+            self.offsets.append(self.next_pos)
+            self.next_pos = skip(self.mv, self.next_pos)
+        v = decode(self.mv, self.offsets[i])
+        self.values[i] = v
+        return v
+
+    def __len__(self):
+        return self.count
+
+def loads(data):
+    # data - bytes, bytearray, mmap or memoryview, must stay alive while the result is used
+    return decode(memoryview(data), 0)
+
+def load_file(filepath):
+    # Maps the file read-only, untouched parts are never read from disk
+    with open(filepath, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(data)
+
+def materialize(obj):
+    # Plain dicts and lists detached from the buffer, e.g. to patch and write back
+    # Typed blobs become numpy arrays, lib.msgpack_stream writes them back as typed blobs
+    if isinstance(obj, LazyMap):
+        return dict((k, materialize(obj[k])) for k in obj)
+    elif isinstance(obj, LazyArray):
+        return [materialize(v) for v in obj]
+    elif isinstance(obj, np.ndarray):
+        # Strided views come from plain float arrays
+        if obj.strides[0] != obj.dtype.itemsize:
+            return obj.tolist()
+        return obj.copy()
+    elif isinstance(obj, memoryview):
+        return obj.tobytes()
+    return obj
@@ -0,0 +1,27 @@
+# Flat skeleton layout, bones in topological order referencing parents by index
+# Operates on parent index lists, no bpy access
+
+def topological_order(parents):
+    # Depth-first order with parents before children, siblings keep their order
+    # parents - parent index of every bone, -1 for roots
+    children = [[] for p in parents]
+    roots = []
+    for i, p in enumerate(parents):
+        if p >= 0:
+            children[p].append(i)
+        else:
+            roots.append(i)
+    order = []
+    stack = roots[::-1]
+    while len(stack) > 0:
+        i = stack.pop()
+        order.append(i)
+        stack += children[i][::-1]
+    return order
+
+def reorder_parents(parents, order):
+    # Parent indices pointing into the reordered bone list
+    position = [0] * len(order)
+    for i, b in enumerate(order):
+        position[b] = i
+    return [position[parents[b]] if parents[b] >= 0 else -1 for b in order]
@@ -0,0 +1,93 @@
+# Bone palette partitioning of skinned meshes
+# Triangles are grouped so that every group references a limited number of bones,
+# vertices shared by groups are duplicated and their bone indices made local to the group palette
+# Operates on exported mesh data, no bpy access
+import numpy as np
+import lib.mesh_batch
+import lib.mesh_split
+
+def entry_vertices(oskin, vertex_count):
+    # Vertex of every entry in the bone index and weight arrays
+    if 'bone_stride' in oskin:
+        return np.repeat(np.arange(vertex_count), oskin['bone_stride'])
+    return np.repeat(np.arange(vertex_count), np.array(oskin['bone_count_array'], dtype=np.int64))
+
+def build_palettes(bone_sets, max_bones):
+    # Greedy passes over distinct bone sets in order of first use,
+    # a set joins the current palette while the union stays within max_bones
+    # Returns palette index of every set and sorted bone list of every palette
+    palette_of = [-1] * len(bone_sets)
+    palettes = []
+    remaining = list(range(len(bone_sets)))
+    while len(remaining) > 0:
+        palette = set()
+        rest = []
+        for s in remaining:
+            union = palette | bone_sets[s]
+            # A set larger than max_bones on its own still gets a palette
+            if len(union) <= max_bones or len(palette) == 0:
+                palette = union
+                palette_of[s] = len(palettes)
+            else:
+                rest.append(s)
+        palettes.append(sorted(palette))
+        remaining = rest
+    return palette_of, palettes
+
+def partition_skin(om, max_bones):
+    # Rewrites index arrays into per-palette index arrays with ia['bone_palette']
+    # Returns number of palettes, 1 if the mesh already fits and was left untouched
+    oskin = om['skin']
+    count = lib.mesh_split.vertex_count(om)
+    index = np.array(oskin['bone_index_array'], dtype=np.int64)
+    weight = np.array(oskin['bone_weight_array'])
+    vertex = entry_vertices(oskin, count)
+    influence = weight != 0
+    if len(np.unique(index[influence])) <= max_bones or len(om['index_arrays']) == 0:
+        return 1
+    tris = np.concatenate([np.array(ia['values'], dtype=np.int64) for ia in om['index_arrays']]).reshape(-1, 3)
+    tri_ia = np.concatenate([np.full(len(ia['values']) // 3, i, dtype=np.int64) for i, ia in enumerate(om['index_arrays'])])
+
+    # Bone set of every triangle, identical sets are handled once
+    bone_count = int(index.max()) + 1
+    mask = np.zeros((count, bone_count), dtype=bool)
+    mask[vertex[influence], index[influence]] = True
+    tri_mask = mask[tris[:, 0]] | mask[tris[:, 1]] | mask[tris[:, 2]]
+    first, inverse = lib.mesh_batch.unique_rows(np.packbits(tri_mask, axis=1))
+    bone_sets = [set(np.nonzero(row)[0].tolist()) for row in tri_mask[first]]
+    palette_of, palettes = build_palettes(bone_sets, max_bones)
+    tri_palette = np.array(palette_of, dtype=np.int64)[inverse]
+
+    used_all = []
+    vertex_palette = []
+    lookup = np.zeros((len(palettes), bone_count), dtype=np.int64)
+    index_arrays = []
+    offset = 0
+    for p, palette in enumerate(palettes):
+        sel = np.nonzero(tri_palette == p)[0]
+        used, local = np.unique(tris[sel], return_inverse=True)
+        local = local.reshape(-1, 3) + offset
+        for i, ia in enumerate(om['index_arrays']):
+            in_ia = tri_ia[sel] == i
+            if not in_ia.any():
+                continue
+            pia = dict(ia)
+            pia['values'] = local[in_ia].ravel().tolist()
+            pia['bone_palette'] = palette
+            index_arrays.append(pia)
+        lookup[p, palette] = np.arange(len(palette))
+        used_all.append(used)
+        vertex_palette.append(np.full(len(used), p, dtype=np.int64))
+        offset += len(used)
+    used_all = np.concatenate(used_all)
+    vertex_palette = np.concatenate(vertex_palette)
+
+    om['vertex_arrays'] = [lib.mesh_split.remap_vertex_array(va, used_all) for va in om['vertex_arrays']]
+    om['index_arrays'] = index_arrays
+    skin = lib.mesh_split.remap_skin(oskin, used_all)
+    # Padding entries of fixed-stride skins may name bones outside the palette, their weight is zero
+    global_index = np.array(skin['bone_index_array'], dtype=np.int64)
+    entry_palette = vertex_palette[entry_vertices(skin, len(used_all))]
+    skin['bone_index_array'] = lookup[entry_palette, global_index].tolist()
+    om['skin'] = skin
+    return len(palettes)
@@ -0,0 +1,43 @@
+# Fixed-stride bone influences for GPU skinning
+# Weights are gathered once per source vertex as a sparse matrix, no bpy access
+import numpy as np
+
+def build_palette(vertex, group, weight, group_remap, vertex_count, influences, bits):
+    # vertex, group, weight - vertex group memberships in coordinate form
+    # group_remap - bone index of every vertex group, -1 for groups without a bone
+    # Returns bone indices and unorm weights of shape (vertex_count, influences), strongest influence first
+    vertex = np.asarray(vertex, dtype=np.int64)
+    weight = np.asarray(weight, dtype=np.float64)
+    bone = np.asarray(group_remap, dtype=np.int64)[np.asarray(group, dtype=np.int64)] if len(vertex) > 0 else vertex
+    keep = (bone >= 0) & (weight != 0.0)
+    vertex, bone, weight = vertex[keep], bone[keep], weight[keep]
+
+    # Rank influences of every vertex by weight, ties keep group order
+    order = np.lexsort((-weight, vertex))
+    vertex, bone, weight = vertex[order], bone[order], weight[order]
+    counts = np.bincount(vertex, minlength=vertex_count)
+    rank = np.arange(len(vertex)) - np.repeat(np.cumsum(counts) - counts, counts)
+    top = rank < influences
+
+    indices = np.zeros((vertex_count, influences), dtype=np.int64)
+    weights = np.zeros((vertex_count, influences), dtype=np.float64)
+    indices[vertex[top], rank[top]] = bone[top]
+    weights[vertex[top], rank[top]] = weight[top]
+    total = weights.sum(axis=1)
+    np.divide(weights, total[:, None], out=weights, where=total[:, None] != 0.0)
+    return indices, quantize_weights(weights, bits, total != 0.0)
+
+def quantize_weights(weights, bits, weighted):
+    # Rounding error goes to the strongest influence, so every weighted vertex sums to exactly one
+    scale = 2**bits - 1
+    q = np.floor(weights * scale + 0.5).astype(np.int64)
+    q[weighted, 0] += scale - q[weighted].sum(axis=1)
+    return q
+
+def palette_skin(oskin, indices, weights, vertex_indices, bits):
+    # Writes influences of exported vertices, every vertex has the same number of entries
+    vertex_indices = np.asarray(vertex_indices, dtype=np.int64)
+    oskin['bone_stride'] = indices.shape[1]
+    oskin['bone_weight_bits'] = bits
+    oskin['bone_index_array'] = indices[vertex_indices].ravel().tolist()
+    oskin['bone_weight_array'] = weights[vertex_indices].ravel().tolist()
@@ -0,0 +1,19 @@
+# Matrix tracks recorded in a single sweep over the timeline
+# Operates on sampled arrays of shape (frames, tracks, 4, 4), no bpy access
+import numpy as np
+
+def animated(samples, rest, epsilon):
+    # Tracks differing from their rest matrices on any frame
+    return (np.abs(samples - rest[None]) > epsilon).any(axis=(0, 2, 3))
+
+def parent_relative(samples, parents):
+    # Matrices relative to parent tracks, parents holds -1 for roots
+    res = samples.copy()
+    child = np.nonzero(parents >= 0)[0]
+    if len(child) > 0:
+        res[:, child] = np.matmul(np.linalg.inv(samples[:, parents[child]]), samples[:, child])
+    return res
+
+def frame_times(begin, end, frame_time):
+    # Key times of a track sampled on frames begin to end
+    return [(i - begin) * frame_time for i in range(begin, end + 1)]
@@ -0,0 +1,104 @@
+# Typed binary arrays for .arm files
+# Homogeneous numeric lists are stored as msgpack ext blobs of little-endian data,
+# the ext type code tags the element type
+import array
+import sys
+import lib.umsgpack
+
+# dtype: (ext type, array typecode)
+ext_types = {
+    'float32': (1, 'f'),
+    'uint8': (2, 'B'),
+    'uint16': (3, 'H'),
+    'uint32': (4, 'I'),
+    'int16': (5, 'h'),
+    'int32': (6, 'i'),
+    'float16': (7, 'H'), # Half float bit patterns
+    'int8': (8, 'b'),
+}
+ext_dtypes = {t[0]: dtype for dtype, t in ext_types.items()}
+
+# Keys holding numeric payloads
+array_keys = ('values', 'bone_weight_array', 'bone_index_array', 'bone_count_array', 'instance_offsets',
+              'triangle_offsets', 'triangle_counts', 'bounds', 'cones',
+              'parents', 'translations', 'rotations', 'scales', 'inverse_binds')
+min_length = 16
+
+def is_numeric(values):
+    for v in values:
+        t = type(v)
+        if t is not float and t is not int:
+            return False
+    return len(values) > 0
+
+def pick_dtype(values):
+    # Floats go to float32, integers to the smallest type holding their range
+    # None when the range does not fit 32 bits, such values stay a plain msgpack array
+    if not all(type(v) is int for v in values):
+        return 'float32'
+    lo = min(values)
+    hi = max(values)
+    if lo < 0:
+        if lo >= -2**15 and hi < 2**15:
+            return 'int16'
+        if lo >= -2**31 and hi < 2**31:
+            return 'int32'
+        return None
+    if hi < 2**8:
+        return 'uint8'
+    if hi < 2**16:
+        return 'uint16'
+    if hi < 2**32:
+        return 'uint32'
+    return None
+
+def encode(values, dtype=None):
+    if dtype == None:
+        dtype = pick_dtype(values)
+    ext_type, typecode = ext_types[dtype]
+    a = array.array(typecode, values)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return lib.umsgpack.Ext(ext_type, a.tobytes())
+
+def decode(ext):
+    typecode = ext_types[ext_dtypes[ext.type]][1]
+    a = array.array(typecode)
+    a.frombytes(ext.data)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a.tolist()
+
+def pack_arrays(obj):
+    # Returns a copy of obj with numeric payloads replaced by typed blobs
+    if isinstance(obj, dict):
+        # Arrays with an explicit element type, e.g. quantized vertex data
+        dtype = obj.get('type')
+        if not isinstance(dtype, str) or dtype not in ext_types:
+            dtype = None
+        res = {}
+        for k, v in obj.items():
+            if k in array_keys and isinstance(v, list):
+                res[k] = pack_values(v, dtype)
+            else:
+                res[k] = pack_arrays(v)
+        return res
+    elif isinstance(obj, list):
+        return [pack_arrays(v) for v in obj]
+    return obj
+
+def pack_values(values, dtype=None):
+    # Lists of rows (e.g. animation matrices) store one blob per row
+    if len(values) > 0 and isinstance(values[0], list):
+        if all(isinstance(v, list) and is_numeric(v) for v in values):
+            dtypes = [dtype if dtype != None else pick_dtype(v) for v in values]
+            if None in dtypes:
+                return values
+            return [encode(v, d) for v, d in zip(values, dtypes)]
+        return pack_arrays(values)
+    if (len(values) >= min_length or dtype != None) and is_numeric(values):
+        if dtype == None:
+            dtype = pick_dtype(values)
+        if dtype != None:
+            return encode(values, dtype)
+    return values
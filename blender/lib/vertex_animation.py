@@ -0,0 +1,53 @@
+# Vertex animation textures for meshes deformed by shape keys, cloth or modifiers
+# Position and normal deltas against the rest pose, stored only for vertices that move
+# Operates on sampled arrays, no bpy access
+import numpy as np
+
+epsilon = 1e-5
+
+def quantize_deltas(deltas, bits):
+    # Snorm normalized to the largest delta per axis, decode as value / max * scale
+    m = float(2**(bits - 1) - 1)
+    scale = np.abs(deltas).reshape(-1, 3).max(axis=0) if deltas.size > 0 else np.zeros(3, dtype=deltas.dtype)
+    scale[scale == 0.0] = 1.0
+    q = np.round(deltas * (m / scale)).astype(np.int32)
+    return q, scale
+
+def bake(positions, normals, rest_positions, rest_normals, begin_frame, frame_rate):
+    # positions, normals - (frames, vertices, 3) samples of every source vertex, overwritten with deltas
+    # Returns vertex animation data and the texture column of every source vertex, -1 for static ones
+    dp = positions
+    dp -= rest_positions[None]
+    dn = normals
+    dn -= rest_normals[None]
+    moving = (np.abs(dp) > epsilon).any(axis=(0, 2)) | (np.abs(dn) > epsilon).any(axis=(0, 2))
+    ids = np.nonzero(moving)[0]
+    columns = np.full(len(rest_positions), -1, dtype=np.int64)
+    columns[ids] = np.arange(len(ids))
+
+    q_pos, pos_scale = quantize_deltas(dp[:, ids], 16)
+    q_nor, nor_scale = quantize_deltas(dn[:, ids], 8)
+    ova = {}
+    ova['frame_count'] = len(positions)
+    ova['vertex_count'] = len(ids)
+    ova['begin_frame'] = begin_frame
+    ova['frame_rate'] = frame_rate
+    ova['positions'] = {}
+    ova['positions']['type'] = 'int16'
+    ova['positions']['scale'] = pos_scale.tolist()
+    ova['positions']['values'] = q_pos.ravel().tolist()
+    ova['normals'] = {}
+    ova['normals']['type'] = 'int8'
+    ova['normals']['scale'] = nor_scale.tolist()
+    ova['normals']['values'] = q_nor.ravel().tolist()
+    return ova, columns
+
+def add_vertex_animation(om, vertex_animation, vertex_indices):
+    # Exported vertices find their texture column through the vat_index attribute
+    ova, columns = vertex_animation
+    va = {}
+    va['attrib'] = 'vat_index'
+    va['size'] = 1
+    va['values'] = columns[np.asarray(vertex_indices, dtype=np.int64)].tolist()
+    om['vertex_arrays'].append(va)
+    om['vertex_animation'] = ova
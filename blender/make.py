@@ -15,6 +15,8 @@ import nodes_renderpath
 import nodes_world
 import path_tracer
 from exporter import ArmoryExporter
+import lib.asset_pack
+import lib.block_compress
 import lib.make_datas
 import lib.make_variants
 import utils
@@ -146,6 +148,20 @@ def export_data(fp, sdk_path, is_play=False):
     # Reset path
     os.chdir(fp)
 
+    # Replace compiled data files with packs or compressed copies
+    wrd = bpy.data.worlds['Arm']
+    codec = wrd.ArmCompression.lower()
+    cache_dir = 'build/compiled/Blocks'
+    if wrd.ArmAssetPack:
+        packs, packed = lib.asset_pack.write_packs(assets.assets + asset_references, 'build/compiled', 'build/compiled/Packs', codec, wrd.ArmCompressionThreshold, cache_dir)
+        packed = set(packed)
+        assets.assets = [f for f in assets.assets if f not in packed] + packs
+        asset_references = [f for f in asset_references if f not in packed]
+    elif codec != 'none':
+        replaced = lib.block_compress.write_compressed(assets.assets + asset_references, 'build/compiled', 'build/compiled/Compressed', codec, wrd.ArmCompressionThreshold, cache_dir)
+        assets.assets = [replaced.get(f, f) for f in assets.assets]
+        asset_references = [replaced.get(f, f) for f in asset_references]
+
     # Write compiled.glsl
     write_data.write_compiledglsl()
 
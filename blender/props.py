@@ -59,11 +59,6 @@ def invalidate_compiled_data(self, context):
     if os.path.isdir(fp + '/build/compiled/ShaderDatas'):
         shutil.rmtree(fp + '/build/compiled/ShaderDatas')
 
-def invalidate_mesh_data(self, context):
-    fp = utils.get_fp()
-    if os.path.isdir(fp + '/build/compiled/Assets/meshes'):
-        shutil.rmtree(fp + '/build/compiled/Assets/meshes')
-
 def initProperties():
     # For project
     bpy.types.World.ArmVersion = StringProperty(name = "ArmVersion", default="")
@@ -92,8 +87,56 @@ def initProperties():
         name = "Navigation", default='Disabled')
     bpy.types.World.ArmKhafile = StringProperty(name = "Khafile")
     bpy.types.World.ArmMinimize = BoolProperty(name="Minimize Data", default=True, update=invalidate_compiled_data)
-    bpy.types.World.ArmOptimizeMesh = BoolProperty(name="Optimize Meshes", default=False, update=invalidate_mesh_data)
+    bpy.types.World.ArmBinaryArrays = BoolProperty(name="Binary Arrays", description="Store numeric arrays as typed little-endian blobs", default=False, update=invalidate_compiled_data)
+    bpy.types.World.ArmCompactJson = BoolProperty(name="Compact JSON", description="Write numeric arrays on one line with limited float precision", default=False, update=invalidate_compiled_data)
+    bpy.types.World.ArmJsonPositionPrecision = IntProperty(name="Position Decimals", default=5, min=0, max=17, update=invalidate_compiled_data)
+    bpy.types.World.ArmJsonNormalPrecision = IntProperty(name="Normal Decimals", default=4, min=0, max=17, update=invalidate_compiled_data)
+    bpy.types.World.ArmJsonTexcoordPrecision = IntProperty(name="Texcoord Decimals", default=5, min=0, max=17, update=invalidate_compiled_data)
+    bpy.types.World.ArmJsonMatrixPrecision = IntProperty(name="Matrix Decimals", default=6, min=0, max=17, update=invalidate_compiled_data)
+    bpy.types.World.ArmAssetPack = BoolProperty(name="Pack Assets", description="Store compiled .arm files in a few indexed packs instead of separate assets", default=False)
+    bpy.types.World.ArmCompression = EnumProperty(
+        items = [('None', 'None', 'Uncompressed assets'),
+                 ('Zlib', 'Zlib', 'Deflate, fast to decode'),
+                 ('LZMA', 'LZMA', 'Smaller but slower to decode')],
+        name = "Compression", default='None')
+    bpy.types.World.ArmCompressionThreshold = IntProperty(name="Compression Threshold", description="Assets smaller than this many bytes are kept uncompressed", default=1024, min=0)
+    bpy.types.World.ArmOptimizeMesh = EnumProperty(
+        items = [('Fast', 'Fast', 'Per-loop Python export'),
+                 ('Optimized', 'Optimized', 'Slower but exports slightly smaller data'),
+                 ('Vectorized', 'Vectorized', 'NumPy bulk export, same data as Fast')],
+        name = "Mesh Export", default='Fast')
+    bpy.types.World.ArmMeshQuantize = EnumProperty(
+        items = [('None', 'None', 'Full float attributes'),
+                 ('High', 'High', 'Int16 positions, 16-bit octahedral normals, unorm16 uvs'),
+                 ('Low', 'Low', 'Int16 positions, 8-bit octahedral normals, half float uvs')],
+        name = "Quantize Mesh", default='None')
+    bpy.types.World.ArmOptimizeVertexCache = BoolProperty(name="Optimize Vertex Cache", description="Reorder triangles and vertices for post-transform cache reuse", default=False)
+    bpy.types.World.ArmMeshClusters = BoolProperty(name="Mesh Clusters", description="Partition index arrays into meshlets with bounds and normal cones for cluster culling", default=False)
+    bpy.types.World.ArmMeshProcesses = IntProperty(name="Mesh Processes", description="Processes encoding meshes in parallel, 0 for all cores, 1 to encode on the main thread", default=1, min=0)
+    bpy.types.World.ArmSkinInfluences = EnumProperty(
+        items = [('Variable', 'Variable', 'All influences with float weights'),
+                 ('4', '4', 'Strongest 4 influences per vertex'),
+                 ('8', '8', 'Strongest 8 influences per vertex')],
+        name = "Skin Influences", default='Variable')
+    bpy.types.World.ArmSkinWeightBits = EnumProperty(
+        items = [('8', '8', 'Unorm8 weights'),
+                 ('16', '16', 'Unorm16 weights')],
+        name = "Skin Weight Bits", default='8')
+    bpy.types.World.ArmMeshIndexLimit = EnumProperty(
+        items = [('Auto', 'Auto', 'Split meshes for targets without 32-bit index support'),
+                 ('16-bit', '16-bit', 'Split meshes over 65536 vertices'),
+                 ('32-bit', '32-bit', 'Use 32-bit indices for large meshes')],
+        name = "Index Limit", default='Auto')
+    bpy.types.World.ArmMeshWeldDistance = FloatProperty(name="Weld Distance", description="Merge near-identical vertices in optimized mesh export, 0 to disable", default=0.0, min=0.0, precision=6)
     bpy.types.World.ArmSampledAnimation = BoolProperty(name="Sampled Animation", default=False, update=invalidate_compiled_data)
+    bpy.types.World.ArmAnimationTolerance = FloatProperty(name="Animation Tolerance", description="Drop sampled keys that interpolation reproduces within this error, 0 to keep full matrices", default=0.0, min=0.0, precision=5, update=invalidate_compiled_data)
+    bpy.types.World.ArmAnimationQuantize = BoolProperty(name="Quantize Animation", description="Smallest-three rotations, range-quantized translation and scale, uniform key times as start and step", default=False, update=invalidate_compiled_data)
+    bpy.types.World.ArmBakeAnimation = BoolProperty(name="Bake Animation Textures", description="Bake per-frame bone palettes of armature actions into textures", default=False, update=invalidate_compiled_data)
+    bpy.types.World.ArmBakeAnimationFormat = EnumProperty(
+        items = [('Float16', 'Float16', 'Half float texels'),
+                 ('Float32', 'Float32', 'Full float texels')],
+        name = "Animation Texture Format", default='Float16', update=invalidate_compiled_data)
+    bpy.types.World.ArmAnimationFrameStep = IntProperty(name="Animation Frame Step", description="Keep every n-th sampled frame", default=1, min=1, update=invalidate_compiled_data)
     bpy.types.World.ArmDeinterleavedBuffers = BoolProperty(name="Deinterleaved Buffers", default=False)
     bpy.types.World.ArmExportHideRender = BoolProperty(name="Export Hidden Renders", default=False)
     bpy.types.World.ArmSpawnAllLayers = BoolProperty(name="Spawn All Layers", default=False)
@@ -127,6 +170,12 @@ def initProperties():
     bpy.types.Object.instanced_children_scale_z = bpy.props.BoolProperty(name="Z", default=False)
     bpy.types.Object.override_material = bpy.props.BoolProperty(name="Override Material", default=False)
     bpy.types.Object.override_material_name = bpy.props.StringProperty(name="Name", default="")
+    bpy.types.Object.lod_generate = bpy.props.BoolProperty(name="Generate LODs", description="Export simplified levels of detail", default=False)
+    bpy.types.Object.lod_levels = bpy.props.IntProperty(name="Levels", description="Number of simplified levels", default=3, min=1, max=8)
+    bpy.types.Object.lod_ratio = bpy.props.FloatProperty(name="Ratio", description="Triangle count of each level relative to the previous one", default=0.5, min=0.05, max=0.95)
+    bpy.types.Object.vat_bake = bpy.props.BoolProperty(name="Bake Vertex Animation", description="Store per-frame deformation of shape keys and modifiers as a vertex animation texture", default=False)
+    bpy.types.Object.vat_frame_start = bpy.props.IntProperty(name="Start", description="First baked frame", default=1)
+    bpy.types.Object.vat_frame_end = bpy.props.IntProperty(name="End", description="Last baked frame", default=250)
     bpy.types.Object.game_export = bpy.props.BoolProperty(name="Export", default=True)
     bpy.types.Object.game_visible = bpy.props.BoolProperty(name="Visible", default=True)
     bpy.types.Object.spawn = bpy.props.BoolProperty(name="Spawn", description="Auto-add this object when creating scene", default=True)
@@ -143,8 +192,6 @@ def initProperties():
     bpy.types.Object.start_action_name_prop = bpy.props.StringProperty(name="Start Action", description="A name for this item", default="")
     # For mesh
     bpy.types.Mesh.mesh_cached = bpy.props.BoolProperty(name="Mesh Cached", default=False)
-    bpy.types.Mesh.mesh_cached_verts = bpy.props.IntProperty(name="Last Verts", default=0)
-    bpy.types.Mesh.mesh_cached_edges = bpy.props.IntProperty(name="Last Edges", default=0)
     bpy.types.Mesh.static_usage = bpy.props.BoolProperty(name="Static Data Usage", default=True)
     bpy.types.Curve.mesh_cached = bpy.props.BoolProperty(name="Mesh Cached", default=False)
     bpy.types.Curve.static_usage = bpy.props.BoolProperty(name="Static Data Usage", default=True)
@@ -243,6 +290,8 @@ def initProperties():
     # Skin
     bpy.types.World.generate_gpu_skin = bpy.props.BoolProperty(name="GPU Skinning", default=True, update=invalidate_shader_cache)
     bpy.types.World.generate_gpu_skin_max_bones = bpy.props.IntProperty(name="Max Bones", default=50, min=1, max=84, update=invalidate_shader_cache)
+    bpy.types.World.ArmFlatSkeleton = bpy.props.BoolProperty(name="Flat Skeleton", description="Export skin skeletons as parent index and local transform arrays", default=False)
+    bpy.types.World.ArmSkinPartition = bpy.props.BoolProperty(name="Partition Bones", description="Split skinned meshes over the bone limit into bone palettes drawn separately", default=False)
     # Material override flags
     bpy.types.World.force_no_culling = bpy.props.BoolProperty(name="Force No Culling", default=False)
     bpy.types.World.force_anisotropic_filtering = bpy.props.BoolProperty(name="Force Anisotropic Filtering", default=False)
@@ -329,6 +378,16 @@ class ObjectPropsPanel(bpy.types.Panel):
             layout.prop(obj, 'override_material')
             if obj.override_material:
                 layout.prop(obj, 'override_material_name')
+            layout.prop(obj, 'lod_generate')
+            if obj.lod_generate:
+                row = layout.row()
+                row.prop(obj, 'lod_levels')
+                row.prop(obj, 'lod_ratio')
+            layout.prop(obj, 'vat_bake')
+            if obj.vat_bake:
+                row = layout.row()
+                row.prop(obj, 'vat_frame_start')
+                row.prop(obj, 'vat_frame_end')
 
         if obj.type == 'ARMATURE':
             layout.prop(obj, 'bone_animation_enabled')
@@ -658,12 +717,43 @@ class ArmoryBuildPanel(bpy.types.Panel):
         layout.prop(wrd, 'ArmProjectTarget')
         layout.prop(wrd, 'ArmCacheShaders')
         layout.prop(wrd, 'ArmMinimize')
+        if wrd.ArmMinimize:
+            layout.prop(wrd, 'ArmBinaryArrays')
+        else:
+            layout.prop(wrd, 'ArmCompactJson')
+            if wrd.ArmCompactJson:
+                layout.prop(wrd, 'ArmJsonPositionPrecision')
+                layout.prop(wrd, 'ArmJsonNormalPrecision')
+                layout.prop(wrd, 'ArmJsonTexcoordPrecision')
+                layout.prop(wrd, 'ArmJsonMatrixPrecision')
+        layout.prop(wrd, 'ArmAssetPack')
+        layout.prop(wrd, 'ArmCompression')
+        if wrd.ArmCompression != 'None':
+            layout.prop(wrd, 'ArmCompressionThreshold')
         layout.prop(wrd, 'ArmOptimizeMesh')
+        if wrd.ArmOptimizeMesh == 'Optimized':
+            layout.prop(wrd, 'ArmMeshWeldDistance')
+        layout.prop(wrd, 'ArmOptimizeVertexCache')
+        layout.prop(wrd, 'ArmMeshClusters')
+        layout.prop(wrd, 'ArmMeshQuantize')
+        layout.prop(wrd, 'ArmMeshIndexLimit')
+        layout.prop(wrd, 'ArmMeshProcesses')
         layout.prop(wrd, 'ArmSampledAnimation')
+        layout.prop(wrd, 'ArmAnimationTolerance')
+        layout.prop(wrd, 'ArmAnimationFrameStep')
+        layout.prop(wrd, 'ArmAnimationQuantize')
+        layout.prop(wrd, 'ArmBakeAnimation')
+        if wrd.ArmBakeAnimation:
+            layout.prop(wrd, 'ArmBakeAnimationFormat')
         layout.prop(wrd, 'ArmDeinterleavedBuffers')
         layout.prop(wrd, 'generate_gpu_skin')
         if wrd.generate_gpu_skin:
             layout.prop(wrd, 'generate_gpu_skin_max_bones')
+            layout.prop(wrd, 'ArmSkinPartition')
+        layout.prop(wrd, 'ArmFlatSkeleton')
+        layout.prop(wrd, 'ArmSkinInfluences')
+        if wrd.ArmSkinInfluences != 'Variable':
+            layout.prop(wrd, 'ArmSkinWeightBits')
         layout.prop(wrd, 'ArmProjectSamplesPerPixel')
         layout.label('Libraries')
         layout.prop(wrd, 'ArmPhysics')
@@ -1,18 +1,24 @@
 import bpy
-import json
 import os
 import glob
-import lib.umsgpack
+import lib.arm_writer
 import platform
 
 def write_arm(filepath, output):
-    if bpy.data.worlds['Arm'].ArmMinimize:
-        with open(filepath, 'wb') as f:
-            f.write(lib.umsgpack.dumps(output))
-    else:
-        with open(filepath, 'w') as f:
-            # f.write(json.dumps(output, separators=(',',':')))
-            f.write(json.dumps(output, sort_keys=True, indent=4))
+    wrd = bpy.data.worlds['Arm']
+    lib.arm_writer.write_arm(filepath, output, wrd.ArmMinimize, wrd.ArmBinaryArrays, get_json_precision())
+
+def get_json_precision():
+    # Decimals per field class for compact JSON, None for the default writer
+    wrd = bpy.data.worlds['Arm']
+    if not wrd.ArmCompactJson:
+        return None
+    precision = {}
+    precision['position'] = wrd.ArmJsonPositionPrecision
+    precision['normal'] = wrd.ArmJsonNormalPrecision
+    precision['texcoord'] = wrd.ArmJsonTexcoordPrecision
+    precision['matrix'] = wrd.ArmJsonMatrixPrecision
+    return precision
 
 def get_fp():
     s = bpy.data.filepath.split(os.path.sep)
@@ -66,12 +66,40 @@ project.addShaders('Sources/Shaders/**');
 
         if bpy.data.worlds['Arm'].ArmMinimize == False:
             f.write("project.addDefine('WITH_JSON');\n")
+        elif bpy.data.worlds['Arm'].ArmBinaryArrays:
+            f.write("project.addDefine('WITH_BINARY_ARRAYS');\n")
         
+        if bpy.data.worlds['Arm'].ArmAssetPack:
+            f.write("project.addDefine('WITH_ASSET_PACK');\n")
+        if bpy.data.worlds['Arm'].ArmCompression != 'None':
+            f.write("project.addDefine('WITH_COMPRESSION');\n")
+
         if bpy.data.worlds['Arm'].ArmDeinterleavedBuffers == True:
             f.write("project.addDefine('WITH_DEINTERLEAVED');\n")
 
+        if bpy.data.worlds['Arm'].ArmMeshQuantize != 'None':
+            f.write("project.addDefine('WITH_QUANTIZED_MESH');\n")
+
+        if bpy.data.worlds['Arm'].ArmMeshClusters:
+            f.write("project.addDefine('WITH_MESH_CLUSTERS');\n")
+
         if bpy.data.worlds['Arm'].generate_gpu_skin == False:
             f.write("project.addDefine('WITH_CPU_SKIN');\n")
+        elif bpy.data.worlds['Arm'].ArmSkinPartition:
+            f.write("project.addDefine('WITH_SKIN_PALETTE');\n")
+
+        if bpy.data.worlds['Arm'].ArmAnimationTolerance > 0.0 or bpy.data.worlds['Arm'].ArmAnimationFrameStep > 1 or bpy.data.worlds['Arm'].ArmAnimationQuantize:
+            f.write("project.addDefine('WITH_TRS_ANIMATION');\n")
+        if bpy.data.worlds['Arm'].ArmAnimationQuantize:
+            f.write("project.addDefine('WITH_QUANTIZED_ANIMATION');\n")
+        if bpy.data.worlds['Arm'].ArmBakeAnimation:
+            f.write("project.addDefine('WITH_ANIMATION_TEXTURES');\n")
+
+        if bpy.data.worlds['Arm'].ArmFlatSkeleton:
+            f.write("project.addDefine('WITH_FLAT_SKELETON');\n")
+
+        if bpy.data.worlds['Arm'].ArmSkinInfluences != 'Variable':
+            f.write("project.addDefine('WITH_FIXED_SKIN');\n")
 
         for d in assets.khafile_defs:
             f.write("project.addDefine('" + d + "');\n")
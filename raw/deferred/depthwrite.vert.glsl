@@ -11,7 +11,11 @@ precision highp float;
 // #endif
 
 in vec3 pos;
-in vec3 nor;
+#ifdef _Quantized
+	in vec2 nor;
+#else
+	in vec3 nor;
+#endif
 #ifdef _Tex
 	in vec2 tex;
 #endif
@@ -19,7 +23,7 @@ in vec3 nor;
 	in vec3 col;
 #endif
 #ifdef _NorTex
-	in vec3 tan;
+	in vec4 tan;
 #endif
 #ifdef _Skinning
 	in vec4 bone;
@@ -30,6 +34,10 @@ in vec3 nor;
 #endif
 
 uniform mat4 LWVP;
+#ifdef _Quantized
+	uniform vec3 posUnpackOffset;
+	uniform vec3 posUnpackScale;
+#endif
 #ifdef _Skinning
 	uniform float skinBones[skinMaxBones * 8];
 #endif
@@ -86,10 +94,16 @@ void getSkinningDualQuat(vec4 weights, out vec4 A, inout vec4 B) {
 #endif
 
 void main() {
+#ifdef _Quantized
+	vec3 _pos = pos * posUnpackScale + posUnpackOffset;
+#else
+	vec3 _pos = pos;
+#endif
+
 #ifdef _Instancing
-	vec4 sPos = (vec4(pos + off, 1.0));
+	vec4 sPos = (vec4(_pos + off, 1.0));
 #else
-	vec4 sPos = (vec4(pos, 1.0));
+	vec4 sPos = (vec4(_pos, 1.0));
 #endif
 
 #ifdef _Skinning
@@ -7,7 +7,11 @@ precision highp float;
 #include "../compiled.glsl"
 
 in vec3 pos;
-in vec3 nor;
+#ifdef _Quantized
+	in vec2 nor;
+#else
+	in vec3 nor;
+#endif
 #ifdef _BaseTex
 	in vec2 tex;
 #endif
@@ -15,7 +19,7 @@ in vec3 nor;
 	in vec3 col;
 #endif
 #ifdef _NorTex
-	in vec3 tan;
+	in vec4 tan;
 #endif
 #ifdef _Skinning
 	in vec4 bone;
@@ -31,6 +35,14 @@ uniform mat4 V;
 uniform mat4 P;
 uniform vec4 baseCol;
 uniform vec3 eye;
+#ifdef _Quantized
+	uniform vec3 posUnpackOffset;
+	uniform vec3 posUnpackScale;
+#ifdef _Tex
+	uniform vec2 texUnpackOffset;
+	uniform vec2 texUnpackScale;
+#endif
+#endif
 #ifdef _Skinning
 	uniform float skinBones[skinMaxBones * 8];
 #endif
@@ -98,12 +110,30 @@ void getSkinningDualQuat(vec4 weights, out vec4 A, inout vec4 B) {
 }
 #endif
 
+#ifdef _Quantized
+// Octahedral encoded normal, see lib/mesh_quantize.py
+vec3 decodeNormal(vec2 e) {
+	vec3 n = vec3(e.xy, 1.0 - abs(e.x) - abs(e.y));
+	if (n.z < 0.0) {
+		n.xy = (1.0 - abs(e.yx)) * vec2(e.x >= 0.0 ? 1.0 : -1.0, e.y >= 0.0 ? 1.0 : -1.0);
+	}
+	return normalize(n);
+}
+#endif
+
 void main() {
+#ifdef _Quantized
+	vec3 _pos = pos * posUnpackScale + posUnpackOffset;
+	vec3 _nor = decodeNormal(nor);
+#else
+	vec3 _pos = pos;
+	vec3 _nor = nor;
+#endif
 
 #ifdef _Instancing
-	vec4 sPos = (vec4(pos + off, 1.0));
+	vec4 sPos = (vec4(_pos + off, 1.0));
 #else
-	vec4 sPos = (vec4(pos, 1.0));
+	vec4 sPos = (vec4(_pos, 1.0));
 #endif
 
 #ifdef _Skinning
@@ -112,9 +142,9 @@ void main() {
 	getSkinningDualQuat(weight, skinA, skinB);
 	sPos.xyz += 2.0 * cross(skinA.xyz, cross(skinA.xyz, sPos.xyz) + skinA.w * sPos.xyz); // Rotate
 	sPos.xyz += 2.0 * (skinA.w * skinB.xyz - skinB.w * skinA.xyz + cross(skinA.xyz, skinB.xyz)); // Translate
-	vec3 _normal = normalize(mat3(N) * (nor + 2.0 * cross(skinA.xyz, cross(skinA.xyz, nor) + skinA.w * nor)));
+	vec3 _normal = normalize(mat3(N) * (_nor + 2.0 * cross(skinA.xyz, cross(skinA.xyz, _nor) + skinA.w * _nor)));
 #else
-	vec3 _normal = normalize(mat3(N) * nor);
+	vec3 _normal = normalize(mat3(N) * _nor);
 #endif
 
 	mat4 WV = V * W;
@@ -133,7 +163,11 @@ void main() {
 	wvpposition = gl_Position;
 
 #ifdef _Tex
+#ifdef _Quantized
+	texCoord = tex * texUnpackScale + texUnpackOffset;
+#else
 	texCoord = tex;
+#endif
 #endif
 
 	matColor = baseCol;
@@ -147,8 +181,8 @@ void main() {
 	eyeDir = eye - mPos;
 
 #ifdef _NorTex
-	vec3 tangent = (mat3(N) * (tan));
-	vec3 bitangent = normalize(cross(_normal, tangent));
+	vec3 tangent = (mat3(N) * (tan.xyz));
+	vec3 bitangent = normalize(cross(_normal, tangent)) * tan.w;
 	TBN = mat3(tangent, bitangent, _normal);
 #else
 	normal = _normal;